@@ -1,74 +1,100 @@
 import os
 import csv
-from typing import Dict, List, Tuple, Optional
+import functools
+from typing import Dict, List, Tuple, Optional, TextIO, Union
 from pathlib import Path
 
+# Accepted (lowercase) header names for the annotation CSV columns
+FILENAME_HEADERS = ('filename', 'file', 'image', 'img')
+SOLUTION_HEADERS = ('solution', 'answer', 'truth', 'ground_truth', 'idiom')
 
-def load_annotations(annotations_file: str) -> Dict[str, str]:
+# validate_dataset results kept per (paths, on-disk signatures)
+VALIDATION_CACHE_SIZE = 32
+
+
+def _parse_annotations(csvfile: TextIO, source: str) -> Dict[str, str]:
+    """
+    Parses an open annotations CSV into the basename -> answer mapping.
+    `source` names the file in warnings and errors.
+    """
+    annotations: Dict[str, str] = {}
+    
+    reader = csv.reader(csvfile)
+    
+    # Read and normalize headers
+    try:
+        headers = [h.strip().lower() for h in next(reader)]
+    except StopIteration:
+        raise ValueError(f"Empty CSV file: {source}")
+    
+    # Find required columns (case-insensitive)
+    filename_col = None
+    solution_col = None
+    
+    for i, header in enumerate(headers):
+        if header in FILENAME_HEADERS:
+            filename_col = i
+        elif header in SOLUTION_HEADERS:
+            solution_col = i
+    
+    if filename_col is None:
+        raise ValueError(
+            f"Could not find filename column in {source}. "
+            f"Expected one of: {', '.join(FILENAME_HEADERS)}. Found: {headers}"
+        )
+    
+    if solution_col is None:
+        raise ValueError(
+            f"Could not find solution column in {source}. "
+            f"Expected one of: {', '.join(SOLUTION_HEADERS)}. Found: {headers}"
+        )
+    
+    # Read data rows, streaming straight into the mapping
+    min_columns = max(filename_col, solution_col) + 1
+    splitext = os.path.splitext
+    for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
+        if len(row) < min_columns:
+            print(f"⚠️  Row {row_num}: Not enough columns, skipping")
+            continue
+        
+        filename = row[filename_col].strip()
+        solution = row[solution_col].strip()
+        
+        if not filename or not solution:
+            print(f"⚠️  Row {row_num}: Empty filename or solution, skipping")
+            continue
+        
+        # Remove file extension from filename for consistent matching
+        annotations[splitext(filename)[0]] = solution
+    
+    return annotations
+
+
+def load_annotations(annotations_file: Union[str, TextIO]) -> Dict[str, str]:
     """
     Reads the CSV at `annotations_file` and returns a mapping
     from image basename (no extension) -> ground-truth answer.
+    An already open text stream (e.g. io.StringIO) is read in place.
     Header lookup is case-insensitive, expecting 'filename' & 'solution'.
     """
-    if not os.path.exists(annotations_file):
-        raise FileNotFoundError(f"Annotations file not found: {annotations_file}")
+    is_stream = hasattr(annotations_file, 'read')
+    source = getattr(annotations_file, 'name', '<stream>') if is_stream else annotations_file
     
-    annotations: Dict[str, str] = {}
+    if not is_stream and not os.path.exists(annotations_file):
+        raise FileNotFoundError(f"Annotations file not found: {annotations_file}")
     
     try:
-        with open(annotations_file, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            
-            # Read and normalize headers
-            try:
-                headers = [h.strip().lower() for h in next(reader)]
-            except StopIteration:
-                raise ValueError(f"Empty CSV file: {annotations_file}")
-            
-            # Find required columns (case-insensitive)
-            filename_col = None
-            solution_col = None
-            
-            for i, header in enumerate(headers):
-                if header in ['filename', 'file', 'image', 'img']:
-                    filename_col = i
-                elif header in ['solution', 'answer', 'truth', 'ground_truth', 'idiom']:
-                    solution_col = i
-            
-            if filename_col is None:
-                raise ValueError(
-                    f"Could not find filename column in {annotations_file}. "
-                    f"Expected one of: filename, file, image, img. Found: {headers}"
-                )
-            
-            if solution_col is None:
-                raise ValueError(
-                    f"Could not find solution column in {annotations_file}. "
-                    f"Expected one of: solution, answer, truth, ground_truth, idiom. Found: {headers}"
-                )
-            
-            # Read data rows
-            for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-                if len(row) <= max(filename_col, solution_col):
-                    print(f"⚠️  Row {row_num}: Not enough columns, skipping")
-                    continue
-                
-                filename = row[filename_col].strip()
-                solution = row[solution_col].strip()
-                
-                if not filename or not solution:
-                    print(f"⚠️  Row {row_num}: Empty filename or solution, skipping")
-                    continue
-                
-                # Remove file extension from filename for consistent matching
-                key = os.path.splitext(filename)[0]
-                annotations[key] = solution
+        if is_stream:
+            annotations = _parse_annotations(annotations_file, source)
+        else:
+            with open(annotations_file, newline='', encoding='utf-8') as csvfile:
+                annotations = _parse_annotations(csvfile, source)
         
-        print(f"📊 Loaded {len(annotations)} annotations from {annotations_file}")
+        print(f"📊 Loaded {len(annotations)} annotations from {source}")
         return annotations
         
     except Exception as e:
-        raise ValueError(f"Error reading annotations file {annotations_file}: {e}")
+        raise ValueError(f"Error reading annotations file {source}: {e}")
 
 
 def list_image_paths(images_dir: str, extensions: Optional[List[str]] = None) -> List[str]:
@@ -84,13 +110,13 @@ def list_image_paths(images_dir: str, extensions: Optional[List[str]] = None) ->
     
     # Normalize extensions to lowercase
     extensions = [ext.lower() for ext in extensions]
+    suffixes = tuple(extensions)  # str.endswith checks a tuple in one call
     
     all_files = []
     
     try:
         for filename in os.listdir(images_dir):
-            file_lower = filename.lower()
-            if any(file_lower.endswith(ext) for ext in extensions):
+            if filename.lower().endswith(suffixes):
                 full_path = os.path.join(images_dir, filename)
                 all_files.append(full_path)
         
@@ -171,13 +197,30 @@ def load_dataset(
     return dataset
 
 
-def validate_dataset(images_dir: str, annotations_file: str) -> Dict[str, any]:
+def _path_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of `path`, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _validate_dataset_cached(
+    images_dir: str,
+    annotations_file: str,
+    images_signature: Optional[Tuple[int, int]],
+    annotations_signature: Optional[Tuple[int, int]]
+) -> Dict[str, any]:
     """
-    Validate dataset without loading it fully. Returns validation info.
+    validate_dataset's body. The signatures only key the cache: adding or
+    removing images changes the directory's mtime, and editing the
+    annotations changes the file's.
     """
     validation_info = {
-        "images_dir_exists": os.path.exists(images_dir),
-        "annotations_file_exists": os.path.exists(annotations_file),
+        "images_dir_exists": images_signature is not None,
+        "annotations_file_exists": annotations_signature is not None,
         "image_count": 0,
         "annotation_count": 0,
         "matched_count": 0,
@@ -210,6 +253,19 @@ def validate_dataset(images_dir: str, annotations_file: str) -> Dict[str, any]:
     return validation_info
 
 
+def validate_dataset(images_dir: str, annotations_file: str) -> Dict[str, any]:
+    """
+    Validate dataset without loading it fully. Returns validation info.
+    Repeat calls are served from memory until either path changes on disk.
+    """
+    validation_info = _validate_dataset_cached(
+        images_dir, annotations_file,
+        _path_signature(images_dir), _path_signature(annotations_file)
+    )
+    # Callers get their own copy, so they can't alter the cached entry
+    return {**validation_info, "errors": list(validation_info["errors"])}
+
+
 if __name__ == "__main__":
     # Sanity check with validation
     print("🧪 Testing data loading...")
@@ -1,42 +1,33 @@
 import os
-import json
 import argparse
-from typing import List, Dict, Any
-from experiments.evaluate import extract_idiom, normalize_idiom, clean_extracted_idiom
+import itertools
+import numpy as np
+from typing import List, Dict, Any, Iterable, Iterator
+# extract_idiom and clean_extracted_idiom are re-exported for verify_setup.py
+from experiments.evaluate import (
+    extract_idiom, extract_normalized_idiom, normalize_idiom, clean_extracted_idiom,
+    load_results, attach_normalized, dump_json_pretty, find_results_file, iter_results,
+    normalize_pairs, clear_extraction_caches, NormalizedSample
+)
+
+# Results are streamed through extraction in batches of this many samples
+DEBUG_BATCH_SIZE = 50_000
 
 
 def load_results_for_debug(logs_dir: str, timestamp: str) -> List[Dict[str, Any]]:
     """Load results from a specific timestamp for debugging."""
-    results_path = os.path.join(logs_dir, timestamp, "results.json")
-    if not os.path.exists(results_path):
-        raise FileNotFoundError(f"Results file not found: {results_path}")
-    
-    with open(results_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return load_results(logs_dir, timestamp)
 
 
-def debug_extraction_for_sample(sample: Dict[str, Any], sample_id: int) -> Dict[str, Any]:
-    """Debug extraction process for a single sample."""
-    ground_truth = sample["ground_truth"]
-    raw_prediction = sample["prediction"]
-    
-    # Apply extraction
-    extracted_prediction = extract_idiom(raw_prediction)
-    
-    # Apply normalization
-    normalized_gt = normalize_idiom(ground_truth)
-    normalized_pred = normalize_idiom(extracted_prediction)
-    normalized_raw = normalize_idiom(raw_prediction)
-    
-    # Check matches
-    raw_match = normalized_gt == normalized_raw
-    extracted_match = normalized_gt == normalized_pred
-    
+def build_debug_record(sample: Dict[str, Any], sample_id: int, extracted_prediction: str,
+                       normalized_gt: str, normalized_raw: str, normalized_pred: str,
+                       raw_match: bool, extracted_match: bool) -> Dict[str, Any]:
+    """Assemble the debug record for one sample."""
     return {
         "sample_id": sample_id,
         "image_id": sample.get("image_id", f"sample_{sample_id}"),
-        "ground_truth": ground_truth,
-        "raw_prediction": raw_prediction,
+        "ground_truth": sample["ground_truth"],
+        "raw_prediction": sample["prediction"],
         "extracted_prediction": extracted_prediction,
         "normalized_gt": normalized_gt,
         "normalized_raw": normalized_raw,
@@ -48,13 +39,104 @@ def debug_extraction_for_sample(sample: Dict[str, Any], sample_id: int) -> Dict[
     }
 
 
-def analyze_extraction_performance(debug_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+def debug_extraction_for_sample(sample: Dict[str, Any], sample_id: int) -> Dict[str, Any]:
+    """Debug extraction process for a single sample."""
+    ground_truth = sample["ground_truth"]
+    raw_prediction = sample["prediction"]
+    
+    # Apply extraction and normalization
+    extracted_prediction, normalized_pred = extract_normalized_idiom(raw_prediction)
+    normalized_gt = normalize_idiom(ground_truth)
+    normalized_raw = normalize_idiom(raw_prediction)
+    
+    # Check matches
+    raw_match = normalized_gt == normalized_raw
+    extracted_match = normalized_gt == normalized_pred
+    
+    return build_debug_record(sample, sample_id, extracted_prediction,
+                              normalized_gt, normalized_raw, normalized_pred,
+                              raw_match, extracted_match)
+
+
+def debug_extraction_for_results(results: List[Dict[str, Any]], start: int = 0) -> List[Dict[str, Any]]:
+    """
+    Debug extraction for every sample at once: the batch is normalized through
+    attach_normalized (parallel for large runs). Sample ids are numbered from `start`.
+    """
+    return build_debug_records(results, attach_normalized(results), start)
+
+
+def build_debug_records(results: List[Dict[str, Any]], samples: List[NormalizedSample],
+                        start: int = 0) -> List[Dict[str, Any]]:
+    """Build debug records from already-normalized samples, comparing match flags column-wise."""
+    normalized_gt = np.array([s.normalized_true for s in samples], dtype=object)
+    raw_matches = normalized_gt == np.array([s.normalized_raw for s in samples], dtype=object)
+    extracted_matches = normalized_gt == np.array([s.normalized_extracted for s in samples], dtype=object)
+    
+    return [
+        build_debug_record(sample, i, normalized.extracted,
+                           normalized.normalized_true, normalized.normalized_raw,
+                           normalized.normalized_extracted, raw_match, extracted_match)
+        for i, (sample, normalized, raw_match, extracted_match) in enumerate(
+            zip(results, samples, raw_matches.tolist(), extracted_matches.tolist()), start
+        )
+    ]
+
+
+def iter_debug_records(results_path: str, batch_size: int = DEBUG_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Stream debug records for a results file, reading and extracting
+    `batch_size` samples at a time in this process.
+    """
+    results = iter_results(results_path, streaming=True)
+    start = 0
+    while True:
+        batch = list(itertools.islice(results, batch_size))
+        if not batch:
+            return
+        pairs = [(r["ground_truth"], r["prediction"]) for r in batch]
+        samples = [NormalizedSample(*sample) for sample in zip(*normalize_pairs(pairs))]
+        yield from build_debug_records(batch, samples, start)
+        start += len(batch)
+        # The memoized helpers would otherwise keep every batch's strings alive
+        clear_extraction_caches()
+
+
+def retain_for_display(debug_records: Iterable[Dict[str, Any]], retained: List[Dict[str, Any]],
+                       max_samples: int) -> Iterator[Dict[str, Any]]:
+    """
+    Pass debug records through, appending to `retained` every record that
+    print_sample_details could show: the first `max_samples` overall and the
+    first max(max_samples, 4) of each helped/hurt/unchanged category.
+    """
+    per_category = max(max_samples, 4)
+    helped_seen = hurt_seen = unchanged_seen = 0
+    for i, r in enumerate(debug_records):
+        if r["extraction_helped"]:
+            seen = helped_seen
+            helped_seen += 1
+        elif r["extraction_hurt"]:
+            seen = hurt_seen
+            hurt_seen += 1
+        else:
+            seen = unchanged_seen
+            unchanged_seen += 1
+        
+        if i < max_samples or seen < per_category:
+            retained.append(r)
+        yield r
+
+
+def analyze_extraction_performance(debug_results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """Analyze overall extraction performance."""
-    total_samples = len(debug_results)
-    raw_correct = sum(1 for r in debug_results if r["raw_match"])
-    extracted_correct = sum(1 for r in debug_results if r["extracted_match"])
-    extraction_helped = sum(1 for r in debug_results if r["extraction_helped"])
-    extraction_hurt = sum(1 for r in debug_results if r["extraction_hurt"])
+    # Tally every counter in a single pass over the samples
+    total_samples = raw_correct = extracted_correct = extraction_helped = extraction_hurt = 0
+    for r in debug_results:
+        total_samples += 1
+        raw_correct += r["raw_match"]
+        extracted_correct += r["extracted_match"]
+        extraction_helped += r["extraction_helped"]
+        extraction_hurt += r["extraction_hurt"]
     
     return {
         "total_samples": total_samples,
@@ -92,16 +174,30 @@ def print_sample_details(debug_results: List[Dict[str, Any]],
         samples_to_show = debug_results[:max_samples]
         print(f"\n=== SHOWING ALL SAMPLES (first {max_samples}) ===")
     elif show_helped:
-        samples_to_show = [r for r in debug_results if r["extraction_helped"]][:max_samples]
+        samples_to_show = list(itertools.islice(
+            (r for r in debug_results if r["extraction_helped"]), max_samples
+        ))
         print(f"\n=== SAMPLES WHERE EXTRACTION HELPED (first {max_samples}) ===")
     elif show_hurt:
-        samples_to_show = [r for r in debug_results if r["extraction_hurt"]][:max_samples]
+        samples_to_show = list(itertools.islice(
+            (r for r in debug_results if r["extraction_hurt"]), max_samples
+        ))
         print(f"\n=== SAMPLES WHERE EXTRACTION HURT (first {max_samples}) ===")
     else:
-        # Show a mix: some that helped, some that hurt, some that didn't change
-        helped = [r for r in debug_results if r["extraction_helped"]][:3]
-        hurt = [r for r in debug_results if r["extraction_hurt"]][:3]
-        unchanged = [r for r in debug_results if not r["extraction_helped"] and not r["extraction_hurt"]][:4]
+        # Show a mix: some that helped, some that hurt, some that didn't change.
+        # Collected in one scan that stops once every bucket is full.
+        helped, hurt, unchanged = [], [], []
+        for r in debug_results:
+            if r["extraction_helped"]:
+                if len(helped) < 3:
+                    helped.append(r)
+            elif r["extraction_hurt"]:
+                if len(hurt) < 3:
+                    hurt.append(r)
+            elif len(unchanged) < 4:
+                unchanged.append(r)
+            if len(helped) == 3 and len(hurt) == 3 and len(unchanged) == 4:
+                break
         samples_to_show = helped + hurt + unchanged
         print(f"\n=== SAMPLE DETAILS (mixed selection) ===")
     
@@ -133,8 +229,8 @@ def save_debug_results(debug_results: List[Dict[str, Any]],
         "sample_details": debug_results
     }
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(debug_data, f, indent=2, ensure_ascii=False)
+    with open(output_path, 'wb') as f:
+        f.write(dump_json_pretty(debug_data))
     
     print(f"\nDetailed debug results saved to: {output_path}")
 
@@ -158,22 +254,26 @@ def main():
     
     args = parser.parse_args()
     
-    # Load results
+    # Locate results
     try:
-        results = load_results_for_debug(args.logs_dir, args.timestamp)
-        print(f"Loaded {len(results)} samples from {args.timestamp}")
+        results_path = find_results_file(args.logs_dir, args.timestamp)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         return
     
-    # Debug each sample
-    debug_results = []
-    for i, sample in enumerate(results):
-        debug_info = debug_extraction_for_sample(sample, i)
-        debug_results.append(debug_info)
-    
-    # Analyze performance
-    analysis = analyze_extraction_performance(debug_results)
+    # Debug samples as they are streamed from the results file
+    debug_records = iter_debug_records(results_path)
+    if args.save_debug:
+        # Every record is written out, so keep them all
+        debug_results = list(debug_records)
+        analysis = analyze_extraction_performance(debug_results)
+    else:
+        # Keep only the records that can be displayed
+        debug_results = []
+        analysis = analyze_extraction_performance(
+            retain_for_display(debug_records, debug_results, args.max_samples)
+        )
+    print(f"Loaded {analysis['total_samples']} samples from {args.timestamp}")
     
     # Print summary
     print_debug_summary(analysis)
@@ -1,5 +1,5 @@
 """Experiment orchestration and evaluation utilities."""
-from .evaluate import evaluate, extract_idiom, normalize_idiom
+from .evaluate import evaluate, evaluate_both, extract_idiom, normalize_idiom
 from .utils import ensure_dir
 
-__all__ = ['evaluate', 'extract_idiom', 'normalize_idiom', 'ensure_dir']
\ No newline at end of file
+__all__ = ['evaluate', 'evaluate_both', 'extract_idiom', 'normalize_idiom', 'ensure_dir']
\ No newline at end of file
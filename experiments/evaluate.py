@@ -2,11 +2,111 @@ import os
 import json
 import argparse
 import re
-import yaml
-from typing import List, Set, Dict, Tuple, Optional, Any
-from sklearn.metrics import accuracy_score, f1_score
+import sys
+import pickle
+import functools
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, FrozenSet, Dict, Tuple, Optional, Any, Iterator, NamedTuple
 
+# Optional: lets a prefix of a legacy results.json be read without parsing it all
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
+# Optional: orjson parses and writes JSON several times faster than the json module
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
+# Ground truths and predictions repeat heavily across result sets, so the
+# pure string functions below are memoized
+NORMALIZE_CACHE_SIZE = 100_000
+
+# Result sets at least this large are normalized across worker processes
+PARALLEL_NORMALIZE_THRESHOLD = 10_000
+
+# Result dicts cache their NormalizedSample under this key
+NORMALIZED_KEY = "_normalized"
+
+# Triple curly bracket answer format {{{answer}}}. `re` already scans for the
+# literal '{{{' prefix and [^}] cannot backtrack past a brace, so this stays
+# linear; google-re2 measured ~17x slower per search on typical predictions,
+# and an equivalent hand-written str.find scan 1.1-2x slower.
+_TRIPLE_BRACE_PATTERN = re.compile(r'\{\{\{([^}]+?)\}\}\}', re.DOTALL)
+
+# normalize_idiom patterns
+_EDGE_PUNCTUATION_PATTERN = re.compile(r'^[^\w\s]+|[^\w\s]+$')
+# (literal, pattern, replacement): a pattern can only match when its literal
+# occurs in the text, so the cheap substring test skips most regex scans
+_NORMALIZE_REPLACEMENTS = (
+    ('and', re.compile(r'\band\b'), '&'),     # Convert 'and' to '&' for consistency
+    ('u', re.compile(r'\bu\b'), 'you'),       # Convert 'u' to 'you'
+    ('r', re.compile(r'\br\b'), 'are'),       # Convert 'r' to 'are'
+    ('-', re.compile(r'\s*-\s*'), ' '),       # Convert dashes to spaces
+    ('_', re.compile(r'\s*_\s*'), ' '),       # Convert underscores to spaces
+)
+_LEADING_ARTICLES = ('a ', 'an ', 'the ')
+
+# is_description_text: any of these substrings marks text as a description.
+# One alternation scans the text once instead of once per indicator.
+_DESCRIPTION_INDICATORS = (
+    'this idiom', 'this rebus', 'this puzzle', 'this image', 'this picture',
+    'the idiom', 'the rebus', 'the puzzle', 'the image', 'the picture',
+    'represents', 'means that', 'refers to', 'indicates', 'suggests',
+    'thinking step by step', 'let me think', 'analyzing', 'looking at',
+    'i can see', 'i notice', 'this shows', 'this depicts'
+)
+_DESCRIPTION_INDICATOR_PATTERN = re.compile('|'.join(map(re.escape, _DESCRIPTION_INDICATORS)))
+
+# select_best_idiom_candidate favours candidates containing any of these
+_COMMON_IDIOM_WORDS = ('the', 'a', 'an')
+
+# extract_idiom patterns, tried in order within each tier. They are kept
+# separate rather than fused into one alternation: a fused pattern returns the
+# leftmost match of any pattern instead of honouring this priority order, and
+# even as a no-match prefilter it measured slower than the individual scans.
+# Swapping these for PCRE2-JIT patterns made extract_idiom ~2x slower overall:
+# per-call binding overhead outweighs the faster matching on short responses.
+_QUOTE_CHARS = ('"', "'", '`')
+_QUOTE_PATTERNS = tuple(re.compile(p) for p in (
+    r'"([^"]+)"',
+    r"'([^']+)'",
+    r'`([^`]+)`'
+))
+_IDIOM_INTRO_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:the idiom is|idiom is|answer is|solution is)[:.]?\s*(.+?)(?:\.|$)',
+    r'(?:this idiom is|it is|this is)[:.]?\s*(.+?)(?:\.|$)',
+    r'(?:represents|means)[:.]?\s*(.+?)(?:\.|$)'
+))
+# Literal text each intro pattern needs in order to match
+_IDIOM_INTRO_KEYWORDS = (
+    ('idiom is', 'answer is', 'solution is'),
+    ('this idiom is', 'it is', 'this is'),
+    ('represents', 'means')
+)
+_SENTENCE_SPLIT_PATTERN = re.compile(r'[.!?]+')
+
+# clean_extracted_idiom patterns, applied in order
+_CLEAN_PREFIX_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'^(?:the idiom is|idiom is|answer is|solution is|this is|it is)[:.]?\s*',
+    r'^(?:i think|i believe|this looks like|this appears to be)[:.]?\s*',
+    r'^(?:the answer is|the solution is)[:.]?\s*',
+    r'^(?:this idiom|this rebus|this puzzle)[:.]?\s*(?:represents|means|shows|is)[:.]?\s*'
+))
+_CLEAN_SUFFIX_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'\s*(?:idiom|rebus|puzzle|phrase)$',
+    r'\s*(?:is the answer|is the solution)$'
+))
+
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def extract_idiom(text: str) -> str:
     """
     Extract the most likely idiom from model response text.
@@ -19,8 +119,7 @@ def extract_idiom(text: str) -> str:
     text = text.strip()
     
     # Pattern 1: Look for triple curly brackets (highest priority)
-    triple_brace_pattern = r'\{\{\{([^}]+?)\}\}\}'
-    match = re.search(triple_brace_pattern, text, re.DOTALL)
+    match = _TRIPLE_BRACE_PATTERN.search(text)
     if match:
         extracted = match.group(1).strip()
         if extracted and len(extracted) > 0:
@@ -32,28 +131,23 @@ def extract_idiom(text: str) -> str:
                 return extracted.strip()
     
     # Pattern 2: Look for quoted idioms
-    quote_patterns = [
-        r'"([^"]+)"',
-        r"'([^']+)'",
-        r'`([^`]+)`'
-    ]
-    
-    for pattern in quote_patterns:
-        matches = re.findall(pattern, text)
+    for quote, pattern in zip(_QUOTE_CHARS, _QUOTE_PATTERNS):
+        if quote not in text:
+            continue
+        matches = pattern.findall(text)
         for match in matches:
             cleaned = clean_extracted_idiom(match)
             if is_likely_idiom(cleaned):
                 return cleaned
     
-    # Pattern 3: Look for "The idiom is:" or similar
-    idiom_intro_patterns = [
-        r'(?:the idiom is|idiom is|answer is|solution is)[:.]?\s*(.+?)(?:\.|$)',
-        r'(?:this idiom is|it is|this is)[:.]?\s*(.+?)(?:\.|$)',
-        r'(?:represents|means)[:.]?\s*(.+?)(?:\.|$)'
-    ]
-    
-    for pattern in idiom_intro_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    # Pattern 3: Look for "The idiom is:" or similar. For ASCII text, lower()
+    # folds case exactly as re.IGNORECASE does, so a pattern whose keywords are
+    # all absent cannot match and its scan is skipped.
+    text_lower = text.lower() if text.isascii() else None
+    for keywords, pattern in zip(_IDIOM_INTRO_KEYWORDS, _IDIOM_INTRO_PATTERNS):
+        if text_lower is not None and not any(keyword in text_lower for keyword in keywords):
+            continue
+        match = pattern.search(text)
         if match:
             candidate = match.group(1).strip()
             cleaned = clean_extracted_idiom(candidate)
@@ -69,7 +163,7 @@ def extract_idiom(text: str) -> str:
                 return cleaned
     
     # Pattern 5: Extract from the first sentence if it looks like an idiom
-    sentences = re.split(r'[.!?]+', text)
+    sentences = _SENTENCE_SPLIT_PATTERN.split(text)
     if sentences:
         first_sentence = sentences[0].strip()
         cleaned = clean_extracted_idiom(first_sentence)
@@ -95,6 +189,17 @@ def extract_idiom(text: str) -> str:
     return clean_extracted_idiom(text)
 
 
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def extract_normalized_idiom(text: str) -> Tuple[str, str]:
+    """
+    Return (extracted, normalized_extracted) for a model response, so callers
+    that need both pay a single cache lookup per prediction.
+    """
+    extracted = extract_idiom(text)
+    return extracted, normalize_idiom(extracted)
+
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_idiom(idiom: str) -> str:
     """
     Normalize an idiom for comparison by standardizing format.
@@ -102,33 +207,29 @@ def normalize_idiom(idiom: str) -> str:
     if not idiom:
         return ""
     
-    # Convert to lowercase
-    normalized = idiom.lower().strip()
-    
-    # Remove extra whitespace
-    normalized = re.sub(r'\s+', ' ', normalized)
+    # Convert to lowercase and collapse whitespace (str.split uses the same
+    # whitespace definition as \s)
+    normalized = ' '.join(idiom.lower().split())
     
     # Remove common punctuation at start/end
-    normalized = re.sub(r'^[^\w\s]+|[^\w\s]+$', '', normalized)
+    normalized = _EDGE_PUNCTUATION_PATTERN.sub('', normalized)
     
     # Handle common variations
-    replacements = {
-        r'\band\b': '&',  # Convert 'and' to '&' for consistency
-        r'\bu\b': 'you',   # Convert 'u' to 'you'
-        r'\br\b': 'are',   # Convert 'r' to 'are'
-        r'\s*-\s*': ' ',   # Convert dashes to spaces
-        r'\s*_\s*': ' ',   # Convert underscores to spaces
-    }
-    
-    for pattern, replacement in replacements.items():
-        normalized = re.sub(pattern, replacement, normalized)
-    
-    # Remove articles at the beginning for better matching
-    normalized = re.sub(r'^(a|an|the)\s+', '', normalized)
-    
-    return normalized.strip()
+    for literal, pattern, replacement in _NORMALIZE_REPLACEMENTS:
+        if literal in normalized:
+            normalized = pattern.sub(replacement, normalized)
+    
+    # Remove articles at the beginning for better matching. Only single spaces
+    # remain at this point, and the final strip() drops any extra ones.
+    if normalized.startswith(_LEADING_ARTICLES):
+        normalized = normalized.split(' ', 1)[1]
+    
+    # Interned, so equal normalized idioms are usually the same object and
+    # exact-match comparisons short-circuit on identity
+    return sys.intern(normalized.strip())
 
 
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def clean_extracted_idiom(text: str) -> str:
     """
     Clean extracted text to get just the idiom phrase.
@@ -144,25 +245,16 @@ def clean_extracted_idiom(text: str) -> str:
         cleaned = cleaned[3:-3].strip()
     
     # Remove common prefixes/suffixes
-    prefixes_to_remove = [
-        r'^(?:the idiom is|idiom is|answer is|solution is|this is|it is)[:.]?\s*',
-        r'^(?:i think|i believe|this looks like|this appears to be)[:.]?\s*',
-        r'^(?:the answer is|the solution is)[:.]?\s*',
-        r'^(?:this idiom|this rebus|this puzzle)[:.]?\s*(?:represents|means|shows|is)[:.]?\s*'
-    ]
-    
-    for prefix in prefixes_to_remove:
-        cleaned = re.sub(prefix, '', cleaned, flags=re.IGNORECASE)
+    for prefix in _CLEAN_PREFIX_PATTERNS:
+        cleaned = prefix.sub('', cleaned)
     
     # Remove common suffixes
-    suffixes_to_remove = [
-        r'\s*(?:idiom|rebus|puzzle|phrase)$',
-        r'\s*(?:is the answer|is the solution)$',
-        r'\s*(?:\.|!|\?)$'
-    ]
+    for suffix in _CLEAN_SUFFIX_PATTERNS:
+        cleaned = suffix.sub('', cleaned)
     
-    for suffix in suffixes_to_remove:
-        cleaned = re.sub(suffix, '', cleaned, flags=re.IGNORECASE)
+    # Remove one trailing sentence mark and the whitespace before it
+    if cleaned.endswith(('.', '!', '?')):
+        cleaned = cleaned[:-1].rstrip()
     
     # Remove quotes if they wrap the entire string
     cleaned = cleaned.strip()
@@ -173,6 +265,7 @@ def clean_extracted_idiom(text: str) -> str:
     return cleaned.strip()
 
 
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def is_description_text(text: str) -> bool:
     """
     Check if text is likely a description rather than an idiom.
@@ -180,34 +273,23 @@ def is_description_text(text: str) -> bool:
     if not text:
         return True
     
-    description_indicators = [
-        'this idiom', 'this rebus', 'this puzzle', 'this image', 'this picture',
-        'the idiom', 'the rebus', 'the puzzle', 'the image', 'the picture',
-        'represents', 'means that', 'refers to', 'indicates', 'suggests',
-        'thinking step by step', 'let me think', 'analyzing', 'looking at',
-        'i can see', 'i notice', 'this shows', 'this depicts'
-    ]
-    
-    text_lower = text.lower()
-    return any(indicator in text_lower for indicator in description_indicators)
+    return _DESCRIPTION_INDICATOR_PATTERN.search(text.lower()) is not None
 
 
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def is_likely_idiom(text: str) -> bool:
     """
     Check if text looks like a plausible idiom.
     """
-    if not text or len(text.strip()) < 3:
-        return False
-    
-    text = text.strip()
+    text = text.strip() if text else ""
     
-    # Too long to be an idiom
-    if len(text) > 100:
+    # Too short or too long to be an idiom
+    if len(text) < 3 or len(text) > 100:
         return False
     
-    # Check word count (idioms are usually 2-10 words)
-    word_count = len(text.split())
-    if word_count < 1 or word_count > 10:  # Allow single words for some idioms
+    # Check word count (idioms are usually 2-10 words, but single words are
+    # allowed for some idioms). Splitting stops once an 11th word shows up.
+    if len(text.split(None, 10)) > 10:
         return False
     
     # Check for description indicators
@@ -227,8 +309,9 @@ def select_best_idiom_candidate(candidates: List[str]) -> str:
     if len(candidates) == 1:
         return candidates[0]
     
-    # Prefer shorter, more concise candidates
-    scored_candidates = []
+    # Prefer shorter, more concise candidates; ties keep the earliest candidate
+    best_score = -1
+    best_candidate = candidates[0]
     for candidate in candidates:
         score = 0
         word_count = len(candidate.split())
@@ -244,25 +327,32 @@ def select_best_idiom_candidate(candidates: List[str]) -> str:
             score += 5
         
         # Prefer candidates with common idiom patterns
-        if any(word in candidate.lower() for word in ['the', 'a', 'an']):
+        candidate_lower = candidate.lower()
+        if any(word in candidate_lower for word in _COMMON_IDIOM_WORDS):
             score += 2
         
-        scored_candidates.append((score, candidate))
+        if score > best_score:
+            best_score, best_candidate = score, candidate
     
     # Return the highest scoring candidate
-    scored_candidates.sort(key=lambda x: x[0], reverse=True)
-    return scored_candidates[0][1]
+    return best_candidate
+
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def tokenize_for_f1(text: str) -> FrozenSet[str]:
+    """
+    Normalize and tokenize text into the token set used by calculate_token_f1.
+    Tokens are interned so sets built from different texts share the strings.
+    """
+    return frozenset(map(sys.intern, normalize_idiom(text).split()))
 
 
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def calculate_token_f1(ground_truth: str, prediction: str) -> float:
     """
     Calculate token-level F1 score between ground truth and prediction.
+    Cached per (ground_truth, prediction) pair, since runs repeat answers.
     """
-    def tokenize_for_f1(text: str) -> Set[str]:
-        # Normalize and tokenize
-        text = normalize_idiom(text)
-        return set(text.split())
-    
     gt_tokens = tokenize_for_f1(ground_truth)
     pred_tokens = tokenize_for_f1(prediction)
     
@@ -271,19 +361,30 @@ def calculate_token_f1(ground_truth: str, prediction: str) -> float:
     if not gt_tokens or not pred_tokens:
         return 0.0
     
-    # Calculate precision, recall, F1
-    intersection = gt_tokens.intersection(pred_tokens)
-    precision = len(intersection) / len(pred_tokens) if pred_tokens else 0.0
-    recall = len(intersection) / len(gt_tokens) if gt_tokens else 0.0
-    
-    if precision + recall == 0:
+    # Calculate precision, recall, F1 (both token sets are non-empty here)
+    common = len(gt_tokens & pred_tokens)
+    if not common:
         return 0.0
     
+    precision = common / len(pred_tokens)
+    recall = common / len(gt_tokens)
     f1 = 2 * (precision * recall) / (precision + recall)
     return f1
 
 
-def parse_args():
+def clear_extraction_caches() -> None:
+    """
+    Empty the memoized extraction, normalization and F1 helpers, e.g. to
+    isolate tests, or to release the model responses the caches keep alive
+    once a large run has been evaluated.
+    """
+    for func in (extract_idiom, extract_normalized_idiom, normalize_idiom,
+                 clean_extracted_idiom, is_description_text, is_likely_idiom,
+                 tokenize_for_f1, calculate_token_f1):
+        func.cache_clear()
+
+
+def parse_args(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(
         description="Evaluate VLM rebus-puzzle results with advanced idiom extraction."
     )
@@ -314,70 +415,150 @@ def parse_args():
         action="store_true",
         help="Show detailed debug information"
     )
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
-def load_results(logs_dir: str, timestamp: str) -> List[dict]:
+def dump_json_pretty(data: Any) -> bytes:
     """
-    Reads logs/<timestamp>/results.json and returns the list of
-    {image_id, ground_truth, prediction}.
+    Serialize `data` as UTF-8 JSON indented by 2 spaces, using orjson when it is
+    installed and can encode every value.
     """
-    path = os.path.join(logs_dir, timestamp, "results.json")
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"No results.json at {path}")
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        except TypeError:
+            pass  # e.g. NumPy scalars or non-str keys: fall back to the json module
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
 
 
-def evaluate(results: List[dict], use_f1: bool = False, use_extraction: bool = False, debug: bool = False) -> dict:
+def find_results_file(logs_dir: str, timestamp: str) -> str:
     """
-    Compute accuracy and optionally macro F1 with advanced idiom extraction.
-    Returns a metrics dict.
+    Returns the path of the results file for logs/<timestamp>/.
+    Prefers results.ndjson (written incrementally by run_experiment.py) and
+    falls back to results.json from older runs.
     """
-    y_true = []
-    y_pred = []
-    y_pred_extracted = []
-    
-    extraction_debug = []
-    
-    for i, r in enumerate(results):
-        ground_truth = r["ground_truth"]
-        prediction = r["prediction"]
-        
-        # Apply extraction if requested
-        if use_extraction:
-            extracted_prediction = extract_idiom(prediction)
-            y_pred_extracted.append(extracted_prediction)
-            
-            if debug and i < 5:  # Show first 5 examples
-                extraction_debug.append({
-                    "image_id": r.get("image_id", f"sample_{i}"),
-                    "ground_truth": ground_truth,
-                    "raw_prediction": prediction[:200] + "..." if len(prediction) > 200 else prediction,
-                    "extracted": extracted_prediction
-                })
-        else:
-            extracted_prediction = prediction
-        
-        y_true.append(ground_truth)
-        y_pred.append(prediction)
-    
-    # Use extracted predictions for evaluation if extraction is enabled
-    eval_predictions = y_pred_extracted if use_extraction else y_pred
+    run_dir = os.path.join(logs_dir, timestamp)
+    for name in ("results.ndjson", "results.json"):
+        path = os.path.join(run_dir, name)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No results.ndjson or results.json in {run_dir}")
+
+
+def iter_results(path: str, streaming: bool = False) -> Iterator[dict]:
+    """
+    Yields {image_id, ground_truth, prediction} records from a results file.
+    NDJSON files are read line by line; a trailing partial line (e.g. from a
+    crashed run) is skipped. With `streaming=True`, a results.json array is
+    parsed incrementally via ijson when it is installed.
+    """
+    if path.endswith(".ndjson"):
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json_loads(line)
+                except ValueError:
+                    print(f"⚠️  Skipping malformed line in {path}")
+    elif streaming and ijson is not None:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "item")
+    else:
+        with open(path, "rb") as f:
+            yield from json_loads(f.read())
+
+
+def load_cached_results(path: str) -> List[dict]:
+    """
+    Returns all records of a results file, reusing the pickle stored next to it
+    (<path>.pkl) while the file's mtime and size are unchanged.
+    """
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cache_path = path + ".pkl"
     
-    # Exact-match accuracy (with normalization for fair comparison)
-    normalized_true = [normalize_idiom(gt) for gt in y_true]
-    normalized_pred = [normalize_idiom(pred) for pred in eval_predictions]
+    try:
+        with open(cache_path, "rb") as f:
+            cached_signature, results = pickle.load(f)
+        if cached_signature == signature:
+            return results
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        # Unreadable cache entry: rebuild it below
+        pass
+    
+    results = list(iter_results(path))
+    
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((signature, results), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"⚠️  Could not write results cache {cache_path}: {e}")
+        # Don't leave a partial cache file behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    
+    return results
+
+
+def load_results(logs_dir: str, timestamp: str, limit: Optional[int] = None, use_cache: bool = True) -> List[dict]:
+    """
+    Reads logs/<timestamp>/results.ndjson (or results.json) and returns the list of
+    {image_id, ground_truth, prediction}. With `limit`, only the first `limit`
+    records are parsed; full loads are served from a pickle cache when `use_cache`.
+    """
+    path = find_results_file(logs_dir, timestamp)
+    if limit is not None:
+        return list(itertools.islice(iter_results(path, streaming=True), limit))
+    if use_cache:
+        return load_cached_results(path)
+    return list(iter_results(path))
+
+
+def match_mask(a: List[str], b: List[str]) -> np.ndarray:
+    """
+    Boolean array of positions where a[i] == b[i]. The comparison runs elementwise
+    in NumPy over object arrays, which avoids sklearn's per-call label validation.
+    """
+    return np.asarray(a, dtype=object) == np.asarray(b, dtype=object)
+
+
+def count_matches(a: List[str], b: List[str]) -> int:
+    """Count positions where a[i] == b[i]."""
+    return int(np.count_nonzero(match_mask(a, b)))
+
+
+def score_predictions(
+    y_true: List[str],
+    normalized_true: List[str],
+    eval_predictions: List[str],
+    normalized_pred: List[str],
+    use_f1: bool = False,
+    raw_normalized_pred: Optional[List[str]] = None
+) -> dict:
+    """
+    Build the metrics dict from already-normalized ground truths and predictions.
+    Passing `raw_normalized_pred` marks the predictions as extracted and adds the
+    raw-vs-extracted comparison fields.
+    """
+    use_extraction = raw_normalized_pred is not None
+    total = len(y_true)
     
-    exact_matches = sum(1 for gt, pred in zip(normalized_true, normalized_pred) 
-                       if gt == pred)
-    exact_match = exact_matches / len(normalized_true) if normalized_true else 0
+    exact_mask = match_mask(normalized_true, normalized_pred)
+    exact_matches = int(np.count_nonzero(exact_mask))
+    exact_match = exact_matches / total if total else 0
     
     # Raw accuracy (without normalization)
-    raw_accuracy = accuracy_score(y_true, eval_predictions)
+    raw_accuracy = count_matches(y_true, eval_predictions) / total if total else 0
     
     metrics = {
-        "total_samples": len(results),
+        "total_samples": len(y_true),
         "exact_matches": exact_matches,
         "exact_match_accuracy": exact_match,
         "raw_accuracy": raw_accuracy,
@@ -389,10 +570,8 @@ def evaluate(results: List[dict], use_f1: bool = False, use_extraction: bool = F
     
     if use_extraction:
         # Also compute accuracy on raw predictions for comparison
-        raw_normalized_pred = [normalize_idiom(p) for p in y_pred]
-        raw_exact_matches = sum(1 for gt, pred in zip(normalized_true, raw_normalized_pred) 
-                               if gt == pred)
-        raw_exact_match = raw_exact_matches / len(normalized_true) if normalized_true else 0
+        raw_exact_matches = count_matches(normalized_true, raw_normalized_pred)
+        raw_exact_match = raw_exact_matches / total if total else 0
         
         # Calculate extraction improvement
         extraction_improvement = exact_match - raw_exact_match
@@ -406,24 +585,194 @@ def evaluate(results: List[dict], use_f1: bool = False, use_extraction: bool = F
         metrics["extraction_improvement_formatted"] = f"+{extraction_improvement:.4f} (+{extraction_improvement*100:.1f}%)"
     
     if use_f1:
-        # Token-level F1 scores
-        token_f1s = []
-        for gt, pred in zip(y_true, eval_predictions):
-            f1_score = calculate_token_f1(gt, pred)
-            token_f1s.append(f1_score)
-        
-        macro_f1 = sum(token_f1s) / len(token_f1s) if token_f1s else 0.0
+        # Token-level F1 scores; a normalized exact match has identical token
+        # sets, so its F1 is 1.0 without tokenizing
+        token_f1s = (
+            1.0 if matched else calculate_token_f1(gt, pred)
+            for gt, pred, matched in zip(y_true, eval_predictions, exact_mask.tolist())
+        )
+        # Summed left to right (not NumPy's pairwise mean) so macro F1 is
+        # bit-for-bit what earlier runs reported
+        macro_f1 = sum(token_f1s) / total if total else 0.0
         metrics["macro_f1"] = macro_f1
         metrics["macro_f1_formatted"] = f"{macro_f1:.4f} ({macro_f1*100:.1f}%)"
     
+    return metrics
+
+
+def normalize_pairs(pairs: List[Tuple[str, str]]) -> Tuple[List[str], List[str], List[str], List[str]]:
+    """
+    For (ground_truth, prediction) pairs, return the columns
+    (extracted, normalized_true, normalized_raw, normalized_extracted).
+    """
+    extracted = []
+    normalized_true = []
+    normalized_raw = []
+    normalized_extracted = []
+    
+    for ground_truth, prediction in pairs:
+        extracted_prediction, normalized_prediction = extract_normalized_idiom(prediction)
+        extracted.append(extracted_prediction)
+        normalized_true.append(normalize_idiom(ground_truth))
+        normalized_raw.append(normalize_idiom(prediction))
+        normalized_extracted.append(normalized_prediction)
+    
+    return extracted, normalized_true, normalized_raw, normalized_extracted
+
+
+def normalize_pairs_parallel(pairs: List[Tuple[str, str]]) -> Tuple[List[str], List[str], List[str], List[str]]:
+    """
+    Same as normalize_pairs, but splits the pairs into one chunk per CPU and
+    normalizes them in worker processes. Falls back to a single process if
+    the pool cannot be started.
+    """
+    workers = os.cpu_count() or 1
+    chunk_size = -(-len(pairs) // workers)
+    chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    
+    columns = ([], [], [], [])
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_columns in pool.map(normalize_pairs, chunks):
+                columns[0].extend(chunk_columns[0])
+                # Strings interned in a worker arrive as copies; re-intern them here
+                for column, part in zip(columns[1:], chunk_columns[1:]):
+                    column.extend(map(sys.intern, part))
+    except (OSError, BrokenProcessPool) as e:
+        print(f"⚠️  Parallel normalization unavailable ({e}); running in one process")
+        return normalize_pairs(pairs)
+    
+    return columns
+
+
+class NormalizedSample(NamedTuple):
+    """Extraction and normalization results for one {ground_truth, prediction} record."""
+    extracted: str
+    normalized_true: str
+    normalized_raw: str
+    normalized_extracted: str
+
+
+def attach_normalized(results: List[dict]) -> List[NormalizedSample]:
+    """
+    Return a NormalizedSample for every result, computing it only for results
+    that do not have one cached under NORMALIZED_KEY yet and storing it there,
+    so later evaluation and reporting passes reuse the same work.
+    """
+    missing = [r for r in results if NORMALIZED_KEY not in r]
+    if missing:
+        pairs = [(r["ground_truth"], r["prediction"]) for r in missing]
+        if len(pairs) >= PARALLEL_NORMALIZE_THRESHOLD and (os.cpu_count() or 1) > 1:
+            columns = normalize_pairs_parallel(pairs)
+        else:
+            columns = normalize_pairs(pairs)
+        for r, sample in zip(missing, zip(*columns)):
+            r[NORMALIZED_KEY] = NormalizedSample(*sample)
+    
+    return [r[NORMALIZED_KEY] for r in results]
+
+
+def evaluate_both(results: List[dict], use_f1: bool = False) -> Tuple[dict, dict]:
+    """
+    Evaluate without and with idiom extraction, normalizing each sample only once.
+    Returns (metrics_no_extract, metrics_with_extract), identical to calling
+    evaluate() once with use_extraction=False and once with use_extraction=True.
+    Per-sample work is cached on the result dicts (see attach_normalized).
+    """
+    y_true = [r["ground_truth"] for r in results]
+    y_pred = [r["prediction"] for r in results]
+    samples = attach_normalized(results)
+    y_pred_extracted = [n.extracted for n in samples]
+    normalized_true = [n.normalized_true for n in samples]
+    normalized_raw = [n.normalized_raw for n in samples]
+    normalized_extracted = [n.normalized_extracted for n in samples]
+    
+    metrics_no_extract = score_predictions(
+        y_true, normalized_true, y_pred, normalized_raw, use_f1=use_f1
+    )
+    metrics_with_extract = score_predictions(
+        y_true, normalized_true, y_pred_extracted, normalized_extracted,
+        use_f1=use_f1, raw_normalized_pred=normalized_raw
+    )
+    return metrics_no_extract, metrics_with_extract
+
+
+def evaluate(results: List[dict], use_f1: bool = False, use_extraction: bool = False, debug: bool = False) -> dict:
+    """
+    Compute accuracy and optionally macro F1 with advanced idiom extraction.
+    Returns a metrics dict.
+    """
+    # Extraction dominates on large runs: do it across worker processes up
+    # front, keeping the samples local so the caller's result dicts are untouched
+    precomputed = None
+    if (use_extraction and len(results) >= PARALLEL_NORMALIZE_THRESHOLD
+            and (os.cpu_count() or 1) > 1 and any(NORMALIZED_KEY not in r for r in results)):
+        pairs = [(r["ground_truth"], r["prediction"]) for r in results]
+        precomputed = [NormalizedSample(*sample) for sample in zip(*normalize_pairs_parallel(pairs))]
+    
+    y_true = []
+    y_pred = []
+    y_pred_extracted = []
+    normalized_true = []
+    normalized_raw = []
+    normalized_extracted = []
+    
+    extraction_debug = []
+    
+    for i, r in enumerate(results):
+        ground_truth = r["ground_truth"]
+        prediction = r["prediction"]
+        # Reuse the parallel pass, or work cached by attach_normalized, if any
+        cached = precomputed[i] if precomputed is not None else r.get(NORMALIZED_KEY)
+        
+        # Apply extraction if requested
+        if use_extraction:
+            if cached:
+                extracted_prediction, normalized_prediction = cached.extracted, cached.normalized_extracted
+            else:
+                extracted_prediction, normalized_prediction = extract_normalized_idiom(prediction)
+            y_pred_extracted.append(extracted_prediction)
+            normalized_extracted.append(normalized_prediction)
+            
+            if debug and i < 5:  # Show first 5 examples
+                extraction_debug.append({
+                    "image_id": r.get("image_id", f"sample_{i}"),
+                    "ground_truth": ground_truth,
+                    "raw_prediction": prediction[:200] + "..." if len(prediction) > 200 else prediction,
+                    "extracted": extracted_prediction
+                })
+        
+        y_true.append(ground_truth)
+        y_pred.append(prediction)
+        
+        # Normalize for fair exact-match comparison
+        normalized_true.append(cached.normalized_true if cached else normalize_idiom(ground_truth))
+        normalized_raw.append(cached.normalized_raw if cached else normalize_idiom(prediction))
+    
+    # Use extracted predictions for evaluation if extraction is enabled
+    eval_predictions = y_pred_extracted if use_extraction else y_pred
+    normalized_pred = normalized_extracted if use_extraction else normalized_raw
+    
+    # Also compare raw predictions when extraction is enabled
+    raw_normalized_pred = normalized_raw if use_extraction else None
+    
+    metrics = score_predictions(
+        y_true, normalized_true, eval_predictions, normalized_pred,
+        use_f1=use_f1, raw_normalized_pred=raw_normalized_pred
+    )
+    
     if debug:
         metrics["extraction_debug"] = extraction_debug
     
     return metrics
 
 
-def main():
-    args = parse_args()
+def main(argv: Optional[List[str]] = None):
+    """
+    Command-line entry point. Pass argv (without the program name) to run an
+    evaluation in-process instead of spawning a new interpreter.
+    """
+    args = parse_args(argv)
     
     print(f"🔍 Evaluating results from {args.timestamp}")
     print(f"📁 Looking in: {args.logs_dir}/{args.timestamp}/")
@@ -448,8 +797,8 @@ def main():
     # Remove debug info before saving
     save_metrics = {k: v for k, v in metrics.items() if k != "extraction_debug"}
     
-    with open(metrics_path, "w", encoding="utf-8") as f:
-        json.dump(save_metrics, f, indent=2)
+    with open(metrics_path, "wb") as f:
+        f.write(dump_json_pretty(save_metrics))
     
     # 4. Print summary
     print(f"\n📊 EVALUATION RESULTS")
@@ -161,13 +161,13 @@ def retry_missing_images(args, missing_images: list):
     if failed:
         print(f"Failed images: {failed}")
     
-    # Update results.json
+    # Rewrite results.ndjson from the saved responses
     if successful > 0:
-        update_results_json(timestamp, cfg)
+        update_results_file(timestamp, cfg)
 
-def update_results_json(timestamp: str, cfg: dict):
-    """Regenerate the complete results.json file"""
-    print(f"\n🔄 Updating results.json...")
+def update_results_file(timestamp: str, cfg: dict):
+    """Regenerate the complete results.ndjson file from the saved responses"""
+    print(f"\n🔄 Updating results.ndjson...")
     
     from data.load_data import load_dataset
     
@@ -194,12 +194,19 @@ def update_results_json(timestamp: str, cfg: dict):
                 "prediction": pred
             })
     
-    # Write updated results
-    results_file = f"logs/{timestamp}/results.json"
+    # Write updated results (one JSON record per line, like run_experiment.py)
+    results_file = f"logs/{timestamp}/results.ndjson"
     with open(results_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
     
     print(f"✅ Updated {results_file} with {len(results)} results")
+    
+    # A results.json from an older run is now stale; remove it so no tool reads it
+    legacy_file = f"logs/{timestamp}/results.json"
+    if os.path.exists(legacy_file):
+        os.remove(legacy_file)
+        print(f"🗑️  Removed superseded {legacy_file}")
 
 def main():
     args = parse_args()
@@ -1,10 +1,10 @@
 import os
 import sys
-import yaml
 import argparse
 import datetime
 import json
 from pathlib import Path
+from typing import List, Optional
 
 project_root = Path(__file__).parent.parent  # Go up from experiments/ to RebusvLMs/
 sys.path.insert(0, str(project_root))
@@ -14,28 +14,16 @@ from prompts.builder import PromptBuilder
 from models.gemini1_5 import Gemini15Client
 from models.gemini2_0 import Gemini20Client
 from models.gemini2_5 import Gemini25Client
-from experiments.utils import ensure_dir, expand_env_vars_recursive
+from experiments.utils import ensure_dir, load_config_files
+
+# Write buffer for results.ndjson
+RESULTS_BUFFER_SIZE = 64 * 1024
 
 
 def load_config(base_path: str, model_path: str):
     """Load and merge configuration files with environment variable expansion."""
     try:
-        # Load base config
-        with open(base_path, 'r', encoding='utf-8') as f:
-            base_config = yaml.safe_load(f)
-        
-        # Load model config
-        with open(model_path, 'r', encoding='utf-8') as f:
-            model_config = yaml.safe_load(f)
-        
-        # Merge configs (model overrides base)
-        merged_config = {**base_config, **model_config}
-        
-        # Expand environment variables
-        expanded_config = expand_env_vars_recursive(merged_config)
-        
-        return expanded_config
-        
+        return load_config_files(base_path, model_path)
     except FileNotFoundError as e:
         print(f"❌ Config file not found: {e}")
         raise
@@ -99,7 +87,50 @@ def validate_config(cfg):
         print(f"   Make sure your CSV file exists with 'Filename' and 'Solution' columns.")
 
 
-def parse_args():
+def load_saved_prediction(response_file: str):
+    """Return the prediction saved at `response_file`, or None if there is none."""
+    try:
+        if os.path.getsize(response_file) == 0:
+            return None
+        with open(response_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("prediction")
+    except (OSError, ValueError):
+        return None
+
+
+def open_results_file(results_file: str, resume: bool):
+    """
+    Open results.ndjson for writing. A fresh run starts an empty file; a resumed
+    run appends to the existing one, so records from earlier attempts survive
+    even if the resume itself is interrupted. Returns (file, recorded_ids), where
+    recorded_ids are the image ids that already have a complete record.
+    """
+    recorded_ids = set()
+    needs_newline = False
+    if resume and os.path.exists(results_file):
+        with open(results_file, "rb") as f:
+            line = b""
+            for line in f:
+                try:
+                    recorded_ids.add(json.loads(line)["image_id"])
+                except (ValueError, KeyError, TypeError):
+                    # Blank or partial line (e.g. from a crash)
+                    continue
+            # Keep a partial last line from swallowing the next record
+            needs_newline = bool(line) and not line.endswith(b"\n")
+    
+    out = open(results_file, "ab" if resume else "wb", buffering=RESULTS_BUFFER_SIZE)
+    if needs_newline:
+        out.write(b"\n")
+    return out, recorded_ids
+
+
+def write_result(out, record: dict):
+    """Append one result record to an open results.ndjson file."""
+    out.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+
+def parse_args(argv: Optional[List[str]] = None):
     p = argparse.ArgumentParser(description="Run VLM rebus puzzle experiments")
     p.add_argument("--config", required=True,
                    help="Model config file (e.g. gemini2.0.yaml)")
@@ -118,11 +149,18 @@ def parse_args():
                    help="Validate setup without running experiments")
     p.add_argument("--max-samples", type=int,
                    help="Limit to first N samples (for testing)")
-    return p.parse_args()
+    p.add_argument("--resume-from",
+                   help="Timestamp of a previous run under logs/ to resume; "
+                        "images with a saved response are skipped")
+    return p.parse_args(argv)
 
 
-def main():
-    args = parse_args()
+def main(argv: Optional[List[str]] = None):
+    """
+    Command-line entry point. Pass argv (without the program name) to run an
+    experiment in-process instead of spawning a new interpreter.
+    """
+    args = parse_args(argv)
 
     print("🚀 RebusvLMs Experiment Runner")
     print("=" * 50)
@@ -152,15 +190,24 @@ def main():
             style = style.replace("_cot", "_nocot")
             print(f"⚠️  Model lacks CoT support → switching to '{style}'")
 
-        # 5) Setup logging
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        # 5) Setup logging (reuse the previous run's folder when resuming)
+        if args.resume_from:
+            ts = args.resume_from
+        else:
+            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         out_dir = os.path.join(cfg["logging"]["dir"], ts)
+        if args.resume_from and not os.path.isdir(out_dir):
+            # A typo in the timestamp must not silently start a fresh run
+            raise FileNotFoundError(f"No run to resume at {out_dir}")
         prompts_dir = os.path.join(out_dir, "prompts")
         responses_dir = os.path.join(out_dir, "responses")
         
         ensure_dir(prompts_dir)
         ensure_dir(responses_dir)
-        print(f"📁 Created output directory: {out_dir}")
+        if args.resume_from:
+            print(f"📁 Resuming in output directory: {out_dir}")
+        else:
+            print(f"📁 Created output directory: {out_dir}")
 
         # 6) Initialize components
         print("🔧 Initializing components...")
@@ -208,43 +255,67 @@ def main():
         print(f"   Model: {cfg['model']['name']}")
         print(f"   Samples: {len(dataset)}")
         
-        results = []
-        for i, (img_path, truth) in enumerate(dataset):
-            print(f"  Processing {i+1}/{len(dataset)}: {os.path.basename(img_path)}")
-            
-            try:
-                # Build prompt
-                prompt = builder.build(style, args.examples_count, img_path)
+        # 9) Stream results to results.ndjson as they are produced, so a
+        #    crashed run keeps everything written up to that point. Resumed
+        #    runs append only the images that aren't recorded yet.
+        results_file = os.path.join(out_dir, "results.ndjson")
+        successful = 0
+        skipped = 0
+        results_out, recorded_ids = open_results_file(results_file, bool(args.resume_from))
+        with results_out:
+            for i, (img_path, truth) in enumerate(dataset):
                 img_id = os.path.splitext(os.path.basename(img_path))[0]
 
-                # Save prompt
-                prompt_file = os.path.join(prompts_dir, f"{img_id}.txt")
-                with open(prompt_file, "w", encoding="utf-8") as f:
-                    f.write(prompt)
+                # Already in results.ndjson from an earlier attempt
+                if img_id in recorded_ids:
+                    successful += 1
+                    skipped += 1
+                    continue
 
-                # Generate response
-                pred = client.generate(prompt, img_path)
-
-                # Save response
+                # Saved response without a record yet (resumed runs): record it
                 response_file = os.path.join(responses_dir, f"{img_id}.json")
-                with open(response_file, "w", encoding="utf-8") as f:
-                    json.dump({"prediction": pred}, f, ensure_ascii=False, indent=2)
-
-                results.append({
-                    "image_id": img_id,
-                    "ground_truth": truth,
-                    "prediction": pred
-                })
+                cached_pred = load_saved_prediction(response_file)
+                if cached_pred is not None:
+                    write_result(results_out, {
+                        "image_id": img_id,
+                        "ground_truth": truth,
+                        "prediction": cached_pred
+                    })
+                    successful += 1
+                    skipped += 1
+                    continue
+
+                print(f"  Processing {i+1}/{len(dataset)}: {os.path.basename(img_path)}")
                 
-            except Exception as e:
-                print(f"    ❌ Error processing {img_path}: {e}")
-                # Continue with next sample
-                continue
+                try:
+                    # Build prompt
+                    prompt = builder.build(style, args.examples_count, img_path)
+
+                    # Save prompt
+                    prompt_file = os.path.join(prompts_dir, f"{img_id}.txt")
+                    with open(prompt_file, "w", encoding="utf-8") as f:
+                        f.write(prompt)
+
+                    # Generate response
+                    pred = client.generate(prompt, img_path)
+
+                    # Save response
+                    with open(response_file, "w", encoding="utf-8") as f:
+                        json.dump({"prediction": pred}, f, ensure_ascii=False, indent=2)
 
-        # 9) Save aggregate results
-        results_file = os.path.join(out_dir, "results.json")
-        with open(results_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+                    write_result(results_out, {
+                        "image_id": img_id,
+                        "ground_truth": truth,
+                        "prediction": pred
+                    })
+                    # Model calls take seconds, so flushing each new result is cheap
+                    results_out.flush()
+                    successful += 1
+                    
+                except Exception as e:
+                    print(f"    ❌ Error processing {img_path}: {e}")
+                    # Continue with next sample
+                    continue
 
         # 10) Save experiment metadata
         metadata = {
@@ -253,7 +324,7 @@ def main():
             "prompt_style": style,
             "examples_count": args.examples_count,
             "total_samples": len(dataset),
-            "successful_samples": len(results),
+            "successful_samples": successful,
             "model_name": cfg["model"]["name"],
             "images_dir": cfg["dataset"]["images_dir"],
             "annotations_file": cfg["dataset"]["annotations_file"]
@@ -264,7 +335,9 @@ def main():
             json.dump(metadata, f, indent=2)
 
         print(f"\n🎉 Experiment completed!")
-        print(f"   Processed: {len(results)}/{len(dataset)} samples")
+        print(f"   Processed: {successful}/{len(dataset)} samples")
+        if skipped:
+            print(f"   Reused: {skipped} saved responses")
         print(f"   Results saved to: {out_dir}")
         print(f"\nNext steps:")
         print(f"   1. Evaluate: python experiments/evaluate.py --timestamp {ts}")
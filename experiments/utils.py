@@ -1,7 +1,23 @@
+import io
 import os
+import pickle
+import hashlib
 import yaml
+from pathlib import Path
 from typing import Any, Dict
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Merged configs are pickled in the user's cache dir before env expansion,
+# keyed by a hash of the config files, so no expanded secrets are ever written
+# to disk. Only the most recently written entries are kept.
+CONFIG_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "rebusvlms" / "config"
+CONFIG_CACHE_MAX_ENTRIES = 32
+
 
 def ensure_dir(path: str):
     """Create directory if it doesn't exist."""
@@ -24,22 +40,89 @@ def expand_env_vars_recursive(data: Any) -> Any:
         return data
 
 
-def load_config_files(base_config_path: str, model_config_path: str) -> Dict[str, Any]:
+def _config_cache_key(*texts: str) -> str:
+    """Hash config file contents, so editing either file invalidates the cached result."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    
+    return digest.hexdigest()[:16]
+
+
+def _evict_config_cache() -> None:
+    """Remove the oldest cached configs beyond CONFIG_CACHE_MAX_ENTRIES."""
+    entries = sorted(CONFIG_CACHE_DIR.glob('*.pkl'), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+    for path in entries[CONFIG_CACHE_MAX_ENTRIES:]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _parse_config(text: str, path: str) -> Dict[str, Any]:
+    """Parse one YAML config file's text, which must hold a top-level mapping."""
+    # A named stream keeps the file name in YAML error messages
+    stream = io.StringIO(text)
+    stream.name = path
+    config = yaml.load(stream, Loader=SafeLoader)
+    if not isinstance(config, dict):
+        raise ValueError(f"Config file must contain a top-level mapping: {path}")
+    return config
+
+
+def load_config_files(base_config_path: str, model_config_path: str, use_cache: bool = True) -> Dict[str, Any]:
     """
     Load and merge base and model-specific config files with environment variable expansion.
+
+    Each file is parsed on its own and the two are shallowly merged, with
+    model keys overriding base keys. The merged config is pickled under
+    CONFIG_CACHE_DIR before expansion and reused while the files are unchanged;
+    environment variables are expanded on every load.
     """
-    # Load base config
     with open(base_config_path, 'r', encoding='utf-8') as f:
-        base_config = yaml.safe_load(f)
+        base_text = f.read()
     
-    # Load model-specific config
     with open(model_config_path, 'r', encoding='utf-8') as f:
-        model_config = yaml.safe_load(f)
+        model_text = f.read()
     
-    # Merge configs (model config overrides base config)
-    merged_config = {**base_config, **model_config}
+    merged_config = None
+    cache_path = None
+    if use_cache:
+        cache_path = CONFIG_CACHE_DIR / f"{_config_cache_key(base_text, model_text)}.pkl"
+        try:
+            with open(cache_path, 'rb') as f:
+                merged_config = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # Unreadable cache entry: rebuild it below
+            pass
     
-    # Expand environment variables recursively
-    expanded_config = expand_env_vars_recursive(merged_config)
+    if merged_config is None:
+        # Load base and model-specific configs
+        base_config = _parse_config(base_text, base_config_path)
+        model_config = _parse_config(model_text, model_config_path)
+        
+        # Merge configs (model config overrides base config)
+        merged_config = {**base_config, **model_config}
+        
+        if cache_path is not None:
+            tmp_path = cache_path.with_suffix('.tmp')
+            try:
+                os.makedirs(CONFIG_CACHE_DIR, mode=0o700, exist_ok=True)
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(merged_config, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+                _evict_config_cache()
+            except OSError:
+                # The cache is optional (e.g. a read-only checkout): skip it
+                # quietly and don't leave a partial file behind
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
     
-    return expanded_config
\ No newline at end of file
+    # Expand environment variables recursively (this builds new containers,
+    # so the cached config is never modified)
+    return expand_env_vars_recursive(merged_config)
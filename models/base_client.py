@@ -1,8 +1,13 @@
 import mimetypes
-import base64
 from typing import Any, Dict, List
 import PIL.Image
 
+# Optional: pybase64 is a SIMD drop-in for the stdlib base64 module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 class BaseClient:
     def __init__(self, config: Dict[str, Any]):
         """
@@ -95,13 +100,11 @@ class BaseClient:
 
     def _generate_vertex(self, model_name: str, prompt: str, image_path: str) -> str:
         """Generate using google-genai (Vertex AI)"""
-        import base64
-        
         # Read and encode image
         with open(image_path, "rb") as f:
             img_data = f.read()
         
-        img_b64 = base64.b64encode(img_data).decode()
+        img_b64 = base64.b64encode(img_data).decode('ascii')
         
         # Build content for Vertex AI using the correct format
         contents = [
@@ -12,12 +12,12 @@ class PromptBuilder:
         self.examples_dir = os.path.join(project_root, config["dataset"]["examples_dir"])
         self.prompts_json = os.path.join(self.examples_dir, "rebus_prompts.json")
 
-        # load the JSON once
-        if not os.path.exists(self.prompts_json):
-            raise FileNotFoundError(f"Sample prompts file not found: {self.prompts_json}")
-            
-        with open(self.prompts_json, 'r', encoding='utf-8') as f:
-            self.sample_prompts = json.load(f)
+        # load the JSON once (open() doubles as the existence check)
+        try:
+            with open(self.prompts_json, 'r', encoding='utf-8') as f:
+                self.sample_prompts = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Sample prompts file not found: {self.prompts_json}") from None
 
         # the question you want to ask for every target image
         self.question = config.get(
@@ -25,12 +25,14 @@ class PromptBuilder:
             "This rebus puzzle is an Idiom which may contain text, figures, and other logical clues to represent the Idiom. Can you figure out what this Idiom is?"
         )
 
-        # set up Jinja2
+        # set up Jinja2; templates don't change during a run, so skip the
+        # per-build() mtime check and serve each one from the cache
         self.jinja = Environment(
             loader=FileSystemLoader(self.templates_dir),
             autoescape=False,
             trim_blocks=True,
             lstrip_blocks=True,
+            auto_reload=False,
         )
 
     def load_examples(self, style: str, count: int) -> List[Dict[str,str]]:
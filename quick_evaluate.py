@@ -1,8 +1,25 @@
-import os
-import json
+import sys
 import argparse
 from typing import List, Dict
-from experiments.evaluate import extract_idiom, normalize_idiom, evaluate
+from experiments.evaluate import evaluate_both, load_results, NORMALIZED_KEY
+
+
+# Sample test cases: (image_id, ground_truth, prediction)
+_SAMPLE_CASES = [
+    ("001", "a drop in the bucket", "The idiom shown is {{{a drop in the bucket}}}"),  # Triple bracket format
+    ("002", "piece of cake", "This rebus represents {{{piece of cake}}}"),  # Triple bracket format
+    ("003", "break the ice", "Looking at this image, I think it shows {{{break the ice}}}"),  # Triple bracket format
+    ("004", "spill the beans", "spill beans"),  # Missing article - test extraction
+    ("005", "kick the bucket", "This is clearly about kicking a bucket - {{{kick the bucket}}}!"),  # Triple bracket format
+]
+
+
+def build_sample_data() -> List[Dict]:
+    """Build the quick test's sample results from _SAMPLE_CASES."""
+    return [
+        {"image_id": image_id, "ground_truth": ground_truth, "prediction": prediction}
+        for image_id, ground_truth, prediction in _SAMPLE_CASES
+    ]
 
 
 def quick_test_sample():
@@ -10,104 +27,70 @@ def quick_test_sample():
     print("🚀 Quick Evaluation Test")
     print("=" * 40)
     
-    # Sample test data
-    sample_data = [
-        {
-            "image_id": "001", 
-            "ground_truth": "a drop in the bucket",
-            "prediction": 'The idiom shown is {{{a drop in the bucket}}}'  # Triple bracket format
-        },
-        {
-            "image_id": "002",
-            "ground_truth": "piece of cake", 
-            "prediction": "This rebus represents {{{piece of cake}}}"  # Triple bracket format
-        },
-        {
-            "image_id": "003",
-            "ground_truth": "break the ice",
-            "prediction": "Looking at this image, I think it shows {{{break the ice}}}"  # Triple bracket format
-        },
-        {
-            "image_id": "004", 
-            "ground_truth": "spill the beans",
-            "prediction": "spill beans"  # Missing article - test extraction
-        },
-        {
-            "image_id": "005",
-            "ground_truth": "kick the bucket", 
-            "prediction": "This is clearly about kicking a bucket - {{{kick the bucket}}}!"  # Triple bracket format
-        }
-    ]
+    sample_data = build_sample_data()
     
     print(f"Testing with {len(sample_data)} sample predictions...")
     
+    # Evaluate without and with extraction in one pass
+    metrics_no_extract, metrics_with_extract = evaluate_both(sample_data, use_f1=True)
+    
     # Test without extraction
     print("\n--- WITHOUT EXTRACTION ---")
-    metrics_no_extract = evaluate(sample_data, use_f1=True, use_extraction=False)
     print(f"Raw accuracy: {metrics_no_extract['raw_accuracy']:.4f}")
     print(f"Exact match: {metrics_no_extract['exact_match_accuracy']:.4f}")
     print(f"Macro F1: {metrics_no_extract.get('macro_f1', 0):.4f}")
     
     # Test with extraction
     print("\n--- WITH EXTRACTION ---")
-    metrics_with_extract = evaluate(sample_data, use_f1=True, use_extraction=True)
     print(f"Raw accuracy: {metrics_with_extract['raw_accuracy']:.4f}")
     print(f"Exact match: {metrics_with_extract['exact_match_accuracy']:.4f}")
     print(f"Macro F1: {metrics_with_extract.get('macro_f1', 0):.4f}")
     
-    # Show extraction details
-    print("\n--- EXTRACTION DETAILS ---")
+    # Show extraction details (collected and written in one go)
+    lines = ["\n--- EXTRACTION DETAILS ---"]
     for i, sample in enumerate(sample_data):
-        print(f"\nSample {i+1} ({sample['image_id']}):")
-        print(f"  Ground truth: {sample['ground_truth']}")
-        print(f"  Raw prediction: {sample['prediction']}")
-        
-        extracted = extract_idiom(sample['prediction'])
-        print(f"  Extracted: {extracted}")
+        lines.append(f"\nSample {i+1} ({sample['image_id']}):")
+        lines.append(f"  Ground truth: {sample['ground_truth']}")
+        lines.append(f"  Raw prediction: {sample['prediction']}")
         
-        # Normalize for comparison
-        gt_norm = normalize_idiom(sample['ground_truth'])
-        raw_norm = normalize_idiom(sample['prediction'])
-        extract_norm = normalize_idiom(extracted)
+        # Extraction/normalization cached on the sample by evaluate_both
+        normalized = sample[NORMALIZED_KEY]
+        lines.append(f"  Extracted: {normalized.extracted}")
         
-        raw_match = gt_norm == raw_norm
-        extract_match = gt_norm == extract_norm
+        raw_match = normalized.normalized_true == normalized.normalized_raw
+        extract_match = normalized.normalized_true == normalized.normalized_extracted
         
-        print(f"  Raw match: {raw_match}")
-        print(f"  Extract match: {extract_match}")
+        lines.append(f"  Raw match: {raw_match}")
+        lines.append(f"  Extract match: {extract_match}")
         
         if extract_match and not raw_match:
-            print("  ✅ Extraction helped!")
+            lines.append("  ✅ Extraction helped!")
         elif raw_match and not extract_match:
-            print("  ❌ Extraction hurt!")
+            lines.append("  ❌ Extraction hurt!")
         else:
-            print("  ➖ No change")
-
+            lines.append("  ➖ No change")
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def quick_evaluate_existing(logs_dir: str, timestamp: str, sample_size: int = None):
     """Quick evaluation of existing results."""
-    results_path = os.path.join(logs_dir, timestamp, "results.json")
-    
-    if not os.path.exists(results_path):
-        print(f"❌ Results file not found: {results_path}")
+    try:
+        # Only the first `sample_size` records are parsed when a size is given
+        results = load_results(logs_dir, timestamp, limit=sample_size or None)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
         return
     
-    with open(results_path, 'r', encoding='utf-8') as f:
-        results = json.load(f)
-    
+    total = len(results)
     if sample_size:
-        results = results[:sample_size]
         print(f"🔍 Quick evaluation of first {sample_size} samples from {timestamp}")
     else:
-        print(f"🔍 Quick evaluation of all {len(results)} samples from {timestamp}")
+        print(f"🔍 Quick evaluation of all {total} samples from {timestamp}")
     
     print("=" * 60)
     
-    # Evaluate without extraction
-    metrics_no_extract = evaluate(results, use_f1=True, use_extraction=False)
-    
-    # Evaluate with extraction  
-    metrics_with_extract = evaluate(results, use_f1=True, use_extraction=True)
+    # Evaluate without and with extraction in one pass
+    metrics_no_extract, metrics_with_extract = evaluate_both(results, use_f1=True)
     
     # Print comparison
     print("COMPARISON RESULTS:")
@@ -123,41 +106,38 @@ def quick_evaluate_existing(logs_dir: str, timestamp: str, sample_size: int = No
     print(f"{'Exact Match Accuracy':<25} {metrics_no_extract['exact_match_accuracy']:<12.4f} {metrics_with_extract['exact_match_accuracy']:<12.4f} {exact_acc_diff:+.4f}")
     print(f"{'Macro F1':<25} {metrics_no_extract.get('macro_f1', 0):<12.4f} {metrics_with_extract.get('macro_f1', 0):<12.4f} {f1_diff:+.4f}")
     
-    print(f"\nTotal samples: {len(results)}")
+    print(f"\nTotal samples: {total}")
     
     if 'raw_exact_match_accuracy' in metrics_with_extract:
         print(f"Raw exact match (baseline): {metrics_with_extract['raw_exact_match_accuracy']:.4f}")
     
     # Show a few examples where extraction made a difference
-    print("\n--- SAMPLE EXTRACTION EXAMPLES ---")
+    lines = ["\n--- SAMPLE EXTRACTION EXAMPLES ---"]
     shown = 0
+    # Extraction/normalization is cached on each sample by evaluate_both
     for i, sample in enumerate(results[:20]):  # Check first 20
-        if shown >= 5:  # Show max 5 examples
-            break
-            
-        gt = sample['ground_truth']
-        pred = sample['prediction']
-        extracted = extract_idiom(pred)
+        normalized = sample[NORMALIZED_KEY]
+        raw_match = normalized.normalized_true == normalized.normalized_raw
+        extract_match = normalized.normalized_true == normalized.normalized_extracted
         
-        gt_norm = normalize_idiom(gt)
-        pred_norm = normalize_idiom(pred)
-        extract_norm = normalize_idiom(extracted)
+        if raw_match == extract_match:  # Extraction made no difference
+            continue
         
-        raw_match = gt_norm == pred_norm
-        extract_match = gt_norm == extract_norm
+        lines.append(f"\nExample {shown + 1} (Sample {i}):")
+        lines.append(f"  GT: {sample['ground_truth']}")
+        lines.append(f"  Raw: {sample['prediction']}")
+        lines.append(f"  Extracted: {normalized.extracted}")
+        lines.append(f"  Raw match: {raw_match}, Extract match: {extract_match}")
+        if extract_match:
+            lines.append("  ✅ Extraction helped!")
+        else:
+            lines.append("  ❌ Extraction hurt!")
         
-        if raw_match != extract_match:  # Extraction made a difference
-            print(f"\nExample {shown + 1} (Sample {i}):")
-            print(f"  GT: {gt}")
-            print(f"  Raw: {pred}")
-            print(f"  Extracted: {extracted}")
-            print(f"  Raw match: {raw_match}, Extract match: {extract_match}")
-            if extract_match and not raw_match:
-                print("  ✅ Extraction helped!")
-            else:
-                print("  ❌ Extraction hurt!")
-            shown += 1
-
+        shown += 1
+        if shown >= 5:  # Show max 5 examples
+            break
+    
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     parser = argparse.ArgumentParser(description="Quick evaluation tool")
@@ -4,7 +4,19 @@ Debug script to figure out the correct google-genai API format
 """
 import os
 import sys
-import base64
+import argparse
+
+# Optional: pybase64 is a SIMD drop-in for the stdlib base64 module
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# Optional: used to pick the image request format for the installed google-genai
+try:
+    from packaging.version import Version, InvalidVersion
+except ImportError:
+    Version = None
 
 # Set environment
 os.environ['GOOGLE_CLOUD_PROJECT'] = 'optical-hexagon-462015-p9'
@@ -14,7 +26,8 @@ os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = '/home/dhayo/work/machinelearning
 try:
     from google import genai
     print("✅ google-genai imported successfully")
-    print(f"📦 google-genai version: {genai.__version__ if hasattr(genai, '__version__') else 'unknown'}")
+    GENAI_VERSION = getattr(genai, '__version__', None)
+    print(f"📦 google-genai version: {GENAI_VERSION or 'unknown'}")
 except ImportError as e:
     print(f"❌ Failed to import google-genai: {e}")
     sys.exit(1)
@@ -41,7 +54,70 @@ def test_text_only():
         print(f"❌ Text-only request failed: {e}")
         return False
 
-def test_image_formats():
+def build_docs_contents(img_b64):
+    """Format 1: Official docs format"""
+    return [
+        "What do you see in this image?",
+        {
+            "mime_type": "image/jpeg",
+            "data": img_b64
+        }
+    ]
+
+def build_parts_contents(img_b64):
+    """Format 2: Parts structure"""
+    return [{
+        "parts": [
+            {"text": "What do you see in this image?"},
+            {
+                "inline_data": {
+                    "mime_type": "image/jpeg",
+                    "data": img_b64
+                }
+            }
+        ]
+    }]
+
+def build_role_parts_contents(img_b64):
+    """Format 3: Role + parts structure"""
+    return [{
+        "role": "user",
+        "parts": [
+            {"text": "What do you see in this image?"},
+            {
+                "inline_data": {
+                    "mime_type": "image/jpeg", 
+                    "data": img_b64
+                }
+            }
+        ]
+    }]
+
+IMAGE_FORMATS = [
+    ("Format 1", "Official docs format", build_docs_contents),
+    ("Format 2", "Parts structure", build_parts_contents),
+    ("Format 3", "Role + parts structure", build_role_parts_contents),
+]
+
+# Role + parts is what models/base_client.py sends; it works on every
+# google-genai release allowed by requirements.txt
+ROLE_PARTS_MIN_VERSION = "0.5.0"
+
+def select_image_formats(exhaustive=False):
+    """Pick the request formats to try based on the installed google-genai version"""
+    if exhaustive or Version is None or GENAI_VERSION is None:
+        return IMAGE_FORMATS
+    
+    try:
+        if Version(GENAI_VERSION) >= Version(ROLE_PARTS_MIN_VERSION):
+            return IMAGE_FORMATS[2:]
+    except InvalidVersion:
+        pass
+    
+    # Unknown or older release: fall back to trying every format
+    return IMAGE_FORMATS
+
+def test_image_formats(exhaustive=False):
     """Test different image formats"""
     print("\n🧪 Testing different image request formats...")
     
@@ -58,68 +134,24 @@ def test_image_formats():
         with open(img_path, "rb") as f:
             img_data = f.read()
         
-        # Format 1: Try the official documentation format
-        print("📝 Format 1: Official docs format")
-        try:
-            response = client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=[
-                    "What do you see in this image?",
-                    {
-                        "mime_type": "image/jpeg",
-                        "data": base64.b64encode(img_data).decode()
-                    }
-                ]
-            )
-            print("✅ Format 1 worked!")
-            return True
-        except Exception as e:
-            print(f"❌ Format 1 failed: {e}")
+        # Encode once and share the string across every format tried
+        img_b64 = base64.b64encode(img_data).decode('ascii')
         
-        # Format 2: Try with parts structure
-        print("📝 Format 2: Parts structure")
-        try:
-            response = client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=[{
-                    "parts": [
-                        {"text": "What do you see in this image?"},
-                        {
-                            "inline_data": {
-                                "mime_type": "image/jpeg",
-                                "data": base64.b64encode(img_data).decode()
-                            }
-                        }
-                    ]
-                }]
-            )
-            print("✅ Format 2 worked!")
-            return True
-        except Exception as e:
-            print(f"❌ Format 2 failed: {e}")
+        formats = select_image_formats(exhaustive)
+        if len(formats) == 1:
+            print(f"📦 google-genai {GENAI_VERSION}: using {formats[0][0]} only (pass --exhaustive to try all)")
         
-        # Format 3: Try with role
-        print("📝 Format 3: Role + parts structure")
-        try:
-            response = client.models.generate_content(
-                model="gemini-1.5-flash",
-                contents=[{
-                    "role": "user",
-                    "parts": [
-                        {"text": "What do you see in this image?"},
-                        {
-                            "inline_data": {
-                                "mime_type": "image/jpeg", 
-                                "data": base64.b64encode(img_data).decode()
-                            }
-                        }
-                    ]
-                }]
-            )
-            print("✅ Format 3 worked!")
-            return True
-        except Exception as e:
-            print(f"❌ Format 3 failed: {e}")
+        for name, label, build_contents in formats:
+            print(f"📝 {name}: {label}")
+            try:
+                response = client.models.generate_content(
+                    model="gemini-1.5-flash",
+                    contents=build_contents(img_b64)
+                )
+                print(f"✅ {name} worked!")
+                return True
+            except Exception as e:
+                print(f"❌ {name} failed: {e}")
             
         return False
         
@@ -145,6 +177,11 @@ def check_library_info():
         return False
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Debug google-genai request formats")
+    parser.add_argument("--exhaustive", action="store_true",
+                       help="Try every image request format instead of the one for this library version")
+    args = parser.parse_args()
+    
     print("🐛 Google GenAI API Debug Script")
     print("=" * 50)
     
@@ -160,7 +197,7 @@ if __name__ == "__main__":
     text_ok = test_text_only()
     
     if text_ok:
-        image_ok = test_image_formats()
+        image_ok = test_image_formats(args.exhaustive)
         if image_ok:
             print("\n🎉 Found working format! Check the successful format above.")
         else:
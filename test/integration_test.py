@@ -1,8 +1,12 @@
 import sys
 import os
+import io
 import tempfile
 import json
+import importlib
+from contextlib import redirect_stdout
 from pathlib import Path
+from unittest import mock
 
 # Add project root to path
 project_root = Path(__file__).parent.parent
@@ -10,30 +14,55 @@ sys.path.insert(0, str(project_root))
 
 from experiments.utils import expand_env_vars_recursive, load_config_files
 from experiments.evaluate import (
-    extract_idiom, normalize_idiom, evaluate, 
+    extract_idiom, normalize_idiom, evaluate_both, 
     calculate_token_f1, is_likely_idiom
 )
+from experiments.evaluate import find_results_file, iter_results, load_cached_results
+from experiments.run_experiment import open_results_file, write_result
 from data.load_data import validate_dataset, load_annotations
 from prompts.builder import PromptBuilder
 
+# The module itself (the package re-exports its `evaluate` function under
+# the same name), used to swap out the optional JSON parsers
+evaluate_module = importlib.import_module("experiments.evaluate")
+
+# Nested config data for the environment variable expansion test
+_ENV_EXPANSION_DATA = {
+    "project": "${GOOGLE_CLOUD_PROJECT}",
+    "nested": {
+        "value": "${HOME}/test",
+        "list": ["${USER}", "static_value"]
+    }
+}
+
+# Extraction pipeline cases that cover various scenarios:
+# (ground_truth, raw_response, expected_extracted, should_match)
+_PIPELINE_CASES = (
+    ("piece of cake",
+     'The idiom shown is "piece of cake"',
+     "piece of cake", True),
+    ("break the ice",
+     "Looking at this image, I think it represents break the ice",
+     "break the ice", True),
+    ("spill the beans",
+     "This puzzle shows spilling beans, so spill beans",
+     "spill beans", False),  # Missing "the"
+    ("kick the bucket",
+     "This image depicts someone kicking a bucket. The idiom is kick the bucket.",
+     "kick the bucket", True),
+)
+
 
 def test_config_loading():
     """Test configuration file loading and environment variable expansion."""
     print("🔧 Testing configuration loading...")
     
-    # Test environment variable expansion
-    test_data = {
-        "project": "${GOOGLE_CLOUD_PROJECT}",
-        "nested": {
-            "value": "${HOME}/test",
-            "list": ["${USER}", "static_value"]
-        }
-    }
-    
     # Set some test environment variables
     os.environ["GOOGLE_CLOUD_PROJECT"] = "test-project-123"
     
-    expanded = expand_env_vars_recursive(test_data)
+    # Test environment variable expansion (it builds a new structure, so the
+    # shared module-level data is left untouched)
+    expanded = expand_env_vars_recursive(_ENV_EXPANSION_DATA)
     
     assert expanded["project"] == "test-project-123"
     assert "test" in expanded["nested"]["value"]
@@ -46,7 +75,7 @@ def test_config_loading():
     
     if os.path.exists(base_config) and os.path.exists(model_config):
         try:
-            config = load_config_files(base_config, model_config)
+            config = load_config_files(base_config, model_config, use_cache=False)
             assert "model" in config
             assert "dataset" in config
             print("  ✅ Config file loading works")
@@ -62,62 +91,34 @@ def test_extraction_pipeline():
     """Test the complete extraction and evaluation pipeline."""
     print("🔍 Testing extraction pipeline...")
     
-    # Test cases that cover various scenarios
-    test_cases = [
-        {
-            "ground_truth": "piece of cake",
-            "raw_response": 'The idiom shown is "piece of cake"',
-            "expected_extracted": "piece of cake",
-            "should_match": True
-        },
-        {
-            "ground_truth": "break the ice", 
-            "raw_response": "Looking at this image, I think it represents break the ice",
-            "expected_extracted": "break the ice",
-            "should_match": True
-        },
-        {
-            "ground_truth": "spill the beans",
-            "raw_response": "This puzzle shows spilling beans, so spill beans",
-            "expected_extracted": "spill beans", 
-            "should_match": False  # Missing "the"
-        },
-        {
-            "ground_truth": "kick the bucket",
-            "raw_response": "This image depicts someone kicking a bucket. The idiom is kick the bucket.",
-            "expected_extracted": "kick the bucket",
-            "should_match": True
-        }
-    ]
-    
     passed_extraction = 0
     passed_evaluation = 0
     
-    for i, case in enumerate(test_cases):
+    for i, (ground_truth, raw_response, expected_extracted, should_match) in enumerate(_PIPELINE_CASES):
         # Test extraction
-        extracted = extract_idiom(case["raw_response"])
+        extracted = extract_idiom(raw_response)
         
-        if extracted == case["expected_extracted"]:
+        if extracted == expected_extracted:
             passed_extraction += 1
             print(f"  ✅ Extraction test {i+1}: {extracted}")
         else:
-            print(f"  ❌ Extraction test {i+1}: expected '{case['expected_extracted']}', got '{extracted}'")
+            print(f"  ❌ Extraction test {i+1}: expected '{expected_extracted}', got '{extracted}'")
         
         # Test evaluation with normalization
-        gt_norm = normalize_idiom(case["ground_truth"])
+        gt_norm = normalize_idiom(ground_truth)
         extracted_norm = normalize_idiom(extracted)
         matches = gt_norm == extracted_norm
         
-        if matches == case["should_match"]:
+        if matches == should_match:
             passed_evaluation += 1
             print(f"  ✅ Evaluation test {i+1}: match={matches}")
         else:
-            print(f"  ❌ Evaluation test {i+1}: expected match={case['should_match']}, got {matches}")
+            print(f"  ❌ Evaluation test {i+1}: expected match={should_match}, got {matches}")
     
-    print(f"  📊 Extraction: {passed_extraction}/{len(test_cases)} passed")
-    print(f"  📊 Evaluation: {passed_evaluation}/{len(test_cases)} passed")
+    print(f"  📊 Extraction: {passed_extraction}/{len(_PIPELINE_CASES)} passed")
+    print(f"  📊 Evaluation: {passed_evaluation}/{len(_PIPELINE_CASES)} passed")
     
-    return passed_extraction == len(test_cases) and passed_evaluation == len(test_cases)
+    return passed_extraction == len(_PIPELINE_CASES) and passed_evaluation == len(_PIPELINE_CASES)
 
 
 def test_evaluation_metrics():
@@ -148,11 +149,9 @@ def test_evaluation_metrics():
         }
     ]
     
-    # Test evaluation without extraction
-    metrics_no_extract = evaluate(test_results, use_f1=True, use_extraction=False)
-    
-    # Test evaluation with extraction  
-    metrics_with_extract = evaluate(test_results, use_f1=True, use_extraction=True)
+    # Test evaluation without and with extraction; ground truths are
+    # normalized once and shared by both passes
+    metrics_no_extract, metrics_with_extract = evaluate_both(test_results, use_f1=True)
     
     # Verify metrics structure
     required_metrics = ["exact_match_accuracy", "raw_accuracy", "total_samples"]
@@ -174,23 +173,25 @@ def test_data_loading():
     """Test data loading functionality."""
     print("📁 Testing data loading...")
     
-    # Test annotation loading with sample data
+    sample_csv = (
+        "Filename,Solution\n"
+        "001,piece of cake\n"
+        "002,break the ice\n"
+        "003,spill the beans\n"
+    )
+    
+    # Test loading annotations straight from memory
+    annotations = load_annotations(io.StringIO(sample_csv))
+    assert len(annotations) == 3
+    assert annotations["001"] == "piece of cake"
+    print("  ✅ Annotation loading works")
+    
+    # Dataset validation checks the filesystem, so it needs a real file
     with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False) as f:
-        # Write sample CSV
-        f.write("Filename,Solution\n")
-        f.write("001,piece of cake\n")
-        f.write("002,break the ice\n")
-        f.write("003,spill the beans\n")
+        f.write(sample_csv)
         temp_csv = f.name
     
     try:
-        # Test loading annotations
-        annotations = load_annotations(temp_csv)
-        assert len(annotations) == 3
-        assert annotations["001"] == "piece of cake"
-        print("  ✅ Annotation loading works")
-        
-        # Test dataset validation
         validation = validate_dataset("nonexistent_dir", temp_csv)
         assert not validation["images_dir_exists"]
         assert validation["annotations_file_exists"]
@@ -207,12 +208,6 @@ def test_prompt_building():
     """Test prompt building if examples are available."""
     print("🔨 Testing prompt building...")
     
-    # Check if sample data exists
-    examples_file = "data/sample/rebus_prompts.json"
-    if not os.path.exists(examples_file):
-        print("  ⚠️  Sample prompts not found - skipping prompt building test")
-        return True
-    
     # Create minimal config for testing
     test_config = {
         "dataset": {
@@ -221,9 +216,18 @@ def test_prompt_building():
         "prompt_question": "Test question?"
     }
     
+    # PromptBuilder reads the sample prompts up front, so a missing file
+    # surfaces here without a separate existence check
     try:
         builder = PromptBuilder(test_config)
-        
+    except FileNotFoundError:
+        print("  ⚠️  Sample prompts not found - skipping prompt building test")
+        return True
+    except Exception as e:
+        print(f"  ❌ Prompt building failed: {e}")
+        return False
+    
+    try:
         # Test zero-shot prompt
         prompt = builder.build("zero_shot", 0, "test_image.jpg")
         assert "Test question?" in prompt
@@ -267,6 +271,130 @@ def test_token_f1():
     return passed == len(test_cases)
 
 
+def test_results_files():
+    """Test the results.ndjson format written by run_experiment and read by evaluate."""
+    print("🗂️  Testing results files...")
+    
+    records = [
+        {"image_id": "001", "ground_truth": "piece of cake", "prediction": "{{{piece of cake}}}"},
+        {"image_id": "002", "ground_truth": "break the ice", "prediction": "Die Eisbrecher — ünïcode"},
+        {"image_id": "003", "ground_truth": "spill the beans", "prediction": ""},
+    ]
+    
+    with tempfile.TemporaryDirectory() as logs_dir:
+        run_dir = os.path.join(logs_dir, "20250101_000000")
+        os.makedirs(run_dir)
+        
+        # A legacy results.json next to the new file must not win
+        legacy_path = os.path.join(run_dir, "results.json")
+        with open(legacy_path, "w", encoding="utf-8") as f:
+            json.dump(records[:1], f)
+        assert find_results_file(logs_dir, "20250101_000000") == legacy_path
+        
+        ndjson_path = os.path.join(run_dir, "results.ndjson")
+        with open(ndjson_path, "wb") as out:
+            for record in records:
+                write_result(out, record)
+        assert find_results_file(logs_dir, "20250101_000000") == ndjson_path
+        print("  ✅ results.ndjson preferred over results.json")
+        
+        # Read back with whatever optional parsers are installed, then with
+        # the stdlib json fallbacks only
+        for label, patches in (
+            ("optional parsers", {"json_loads": evaluate_module.json_loads,
+                                  "ijson": evaluate_module.ijson}),
+            ("stdlib json", {"json_loads": json.loads, "ijson": None}),
+        ):
+            with mock.patch.multiple(evaluate_module, **patches):
+                assert list(iter_results(ndjson_path)) == records
+                assert list(iter_results(legacy_path)) == records[:1]
+                assert list(iter_results(legacy_path, streaming=True)) == records[:1]
+            print(f"  ✅ Records round-trip ({label})")
+    
+    return True
+
+
+def test_resume_results():
+    """Test that resuming a run keeps every record written before."""
+    print("🔁 Testing resumed results files...")
+    
+    records = [
+        {"image_id": f"{n:03d}", "ground_truth": "piece of cake", "prediction": f"answer {n}"}
+        for n in range(1, 5)
+    ]
+    
+    with tempfile.TemporaryDirectory() as run_dir:
+        results_file = os.path.join(run_dir, "results.ndjson")
+        
+        # First attempt writes two records, then crashes mid-way through a third
+        out, recorded_ids = open_results_file(results_file, resume=False)
+        with out:
+            assert recorded_ids == set()
+            for record in records[:2]:
+                write_result(out, record)
+            out.write(b'{"image_id": "003", "groun')
+        
+        # A resume that is interrupted before writing anything loses nothing
+        out, recorded_ids = open_results_file(results_file, resume=True)
+        out.close()
+        assert recorded_ids == {"001", "002"}
+        assert list(iter_results(results_file)) == records[:2]
+        print("  ✅ Interrupted resume keeps earlier records")
+        
+        # A completed resume appends only the missing images
+        out, recorded_ids = open_results_file(results_file, resume=True)
+        with out:
+            for record in records:
+                if record["image_id"] not in recorded_ids:
+                    write_result(out, record)
+        assert list(iter_results(results_file)) == records
+        print("  ✅ Resume appends only missing records")
+    
+    return True
+
+
+def test_results_cache():
+    """Test that the results pickle cache notices edits that keep the file size."""
+    print("💾 Testing results cache...")
+    
+    with tempfile.TemporaryDirectory() as run_dir:
+        results_file = os.path.join(run_dir, "results.ndjson")
+        record = {"image_id": "001", "ground_truth": "piece of cake", "prediction": "cake"}
+        with open(results_file, "wb") as out:
+            write_result(out, record)
+        
+        assert load_cached_results(results_file) == [record]
+        assert os.path.exists(results_file + ".pkl")
+        before = os.stat(results_file)
+        
+        # Same-size edit: only the modification time can tell the files apart
+        edited = {**record, "prediction": "pies"}
+        with open(results_file, "wb") as out:
+            write_result(out, edited)
+        after = os.stat(results_file)
+        assert after.st_size == before.st_size
+        if after.st_mtime_ns == before.st_mtime_ns:
+            # Coarse filesystem clock: make the edit land on a later tick
+            os.utime(results_file, ns=(after.st_atime_ns, before.st_mtime_ns + 1_000_000))
+        
+        assert load_cached_results(results_file) == [edited]
+        assert load_cached_results(results_file) == [edited]  # Served from the refreshed cache
+        print("  ✅ Same-size edit invalidates the cache")
+    
+    return True
+
+
+def _run_test_captured(test_func):
+    """Run one test, returning (passed, exception or None, captured output)."""
+    output = io.StringIO()
+    with redirect_stdout(output):
+        try:
+            passed, error = bool(test_func()), None
+        except Exception as e:
+            passed, error = False, e
+    return passed, error, output.getvalue()
+
+
 def run_integration_tests():
     """Run all integration tests."""
     print("🧪 Running RebusvLMs Integration Tests")
@@ -278,24 +406,28 @@ def run_integration_tests():
         ("Evaluation Metrics", test_evaluation_metrics),
         ("Data Loading", test_data_loading),
         ("Prompt Building", test_prompt_building),
-        ("Token F1 Calculation", test_token_f1)
+        ("Token F1 Calculation", test_token_f1),
+        ("Results Files", test_results_files),
+        ("Resumed Results", test_resume_results),
+        ("Results Cache", test_results_cache)
     ]
     
     passed_tests = 0
     failed_tests = []
     
     for test_name, test_func in tests:
-        print(f"\n{test_name}:")
-        try:
-            if test_func():
-                passed_tests += 1
-                print(f"✅ {test_name} PASSED")
-            else:
-                print(f"❌ {test_name} FAILED")
-                failed_tests.append(test_name)
-        except Exception as e:
-            print(f"❌ {test_name} FAILED with exception: {e}")
+        passed, error, output = _run_test_captured(test_func)
+        if passed:
+            passed_tests += 1
+            status = f"✅ {test_name} PASSED"
+        elif error is not None:
+            status = f"❌ {test_name} FAILED with exception: {error}"
+            failed_tests.append(test_name)
+        else:
+            status = f"❌ {test_name} FAILED"
             failed_tests.append(test_name)
+        # One write per test: header, captured output and verdict
+        sys.stdout.write(f"\n{test_name}:\n{output}{status}\n")
     
     # Summary
     print("\n" + "=" * 50)
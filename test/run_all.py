@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Run the setup check and every script-style test suite in one interpreter,
+so the project modules are imported once instead of once per script.
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import verify_setup
+import test_extraction
+import test_triple_brackets
+import integration_test
+
+
+def main() -> bool:
+    """Run all suites in order; True only if every test suite passed."""
+    # The setup check is informational and has no pass/fail result
+    verify_setup.main()
+
+    suites = [
+        test_extraction.main,
+        test_triple_brackets.main,
+        integration_test.run_integration_tests,
+    ]
+
+    results = []
+    for suite in suites:
+        print("\n")
+        results.append(bool(suite()))
+
+    return all(results)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
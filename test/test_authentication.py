@@ -4,6 +4,7 @@ Simple authentication test for Vertex AI setup
 """
 import os
 import json
+import functools
 
 def check_environment():
     """Check if all required environment variables are set"""
@@ -30,7 +31,7 @@ def check_environment():
                         with open(value, 'r') as f:
                             sa_data = json.load(f)
                             sa_project = sa_data.get('project_id')
-                            env_project = os.environ.get('GOOGLE_CLOUD_PROJECT')
+                            env_project = required_vars['GOOGLE_CLOUD_PROJECT']
                             if sa_project == env_project:
                                 print(f"   ✅ Project IDs match: {sa_project}")
                             else:
@@ -50,14 +51,19 @@ def check_environment():
     
     return all_good
 
+@functools.lru_cache(maxsize=1)
+def _default_credentials():
+    """Run Application Default Credentials discovery once per process"""
+    from google.auth import default
+    return default()
+
 def test_basic_auth():
     """Test basic Google Cloud authentication"""
     print("\n🔍 Testing Basic Authentication...")
     print("=" * 40)
     
     try:
-        from google.auth import default
-        credentials, project = default()
+        credentials, project = _default_credentials()
         print(f"✅ Default credentials found")
         print(f"✅ Authenticated project: {project}")
         return True
@@ -76,6 +82,13 @@ def test_genai_client():
         project = os.environ.get('GOOGLE_CLOUD_PROJECT')
         location = os.environ.get('GOOGLE_CLOUD_LOCATION')
         
+        # Reuse the credentials test_basic_auth discovered; if discovery fails
+        # here, let the client run it and report its own error
+        try:
+            credentials, _ = _default_credentials()
+        except Exception:
+            credentials = None
+        
         # Try different initialization methods for GenAI client
         endpoint = f"{location}-genai.googleapis.com"
         
@@ -85,6 +98,7 @@ def test_genai_client():
                 vertexai=True,
                 project=project,
                 location=location,
+                credentials=credentials,
                 api_endpoint=endpoint
             )
             print("✅ GenAI client initialized successfully (Method 1)!")
@@ -98,7 +112,8 @@ def test_genai_client():
             client = genai.Client(
                 vertexai=True,
                 project=project,
-                location=location
+                location=location,
+                credentials=credentials
             )
             print("✅ GenAI client initialized successfully (Method 2)!")
             print(f"✅ Using default endpoint for {location}")
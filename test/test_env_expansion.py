@@ -6,6 +6,12 @@ import os
 import sys
 import yaml
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 # Ensure environment is set
 os.environ['GOOGLE_CLOUD_PROJECT'] = 'optical-hexagon-462015-p9'
 os.environ['GOOGLE_CLOUD_LOCATION'] = 'us-central1'
@@ -30,12 +36,12 @@ def test_config_expansion():
     try:
         # Load base config
         with open("config/base.yaml", 'r') as f:
-            base_config = yaml.safe_load(f)
+            base_config = yaml.load(f, Loader=SafeLoader)
         print("✅ Base config loaded")
         
         # Load model config
         with open("config/gemini1.5.yaml", 'r') as f:
-            model_config = yaml.safe_load(f)
+            model_config = yaml.load(f, Loader=SafeLoader)
         print("✅ Model config loaded")
         
         # Merge
@@ -1,5 +1,7 @@
 import sys
 import os
+import io
+import contextlib
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from experiments.evaluate import (
@@ -12,6 +14,15 @@ from experiments.evaluate import (
     calculate_token_f1
 )
 
+# Full extraction and evaluation scenario: (response, expected_idiom)
+_INTEGRATION_CASES = (
+    ('The idiom shown in this rebus is "a drop in the bucket"', "a drop in the bucket"),
+    ('Looking at the image, I can see this represents "piece of cake"', "piece of cake"),
+    ('This puzzle shows kick the bucket', "kick the bucket"),
+    ('"Break the ice" - this is a common idiom', "break the ice"),
+    ('The answer is: spill the beans.', "spill the beans"),
+)
+
 
 def test_extract_idiom():
     """Test the extract_idiom function with various input formats."""
@@ -279,27 +290,11 @@ def test_integration():
     """Test the integration of extraction and evaluation."""
     print("\n🧪 Testing integration scenario...")
     
-    # Simulate a full extraction and evaluation scenario
-    test_responses = [
-        'The idiom shown in this rebus is "a drop in the bucket"',
-        'Looking at the image, I can see this represents "piece of cake"',
-        'This puzzle shows kick the bucket',
-        '"Break the ice" - this is a common idiom',
-        'The answer is: spill the beans.',
-    ]
-    
-    expected_idioms = [
-        "a drop in the bucket",
-        "piece of cake", 
-        "kick the bucket",
-        "break the ice",
-        "spill the beans"
-    ]
-    
     print("  Testing full extraction pipeline...")
     passed = 0
     
-    for i, (response, expected) in enumerate(zip(test_responses, expected_idioms)):
+    # normalize_idiom is memoized, so the expected side is only normalized once
+    for i, (response, expected) in enumerate(_INTEGRATION_CASES):
         extracted = extract_idiom(response)
         normalized_extracted = normalize_idiom(extracted)
         normalized_expected = normalize_idiom(expected)
@@ -315,8 +310,8 @@ def test_integration():
             print(f"       Normalized Expected: {repr(normalized_expected)}")
             print(f"       Normalized Extracted: {repr(normalized_extracted)}")
     
-    print(f"Integration tests: {passed}/{len(test_responses)} passed")
-    return passed == len(test_responses)
+    print(f"Integration tests: {passed}/{len(_INTEGRATION_CASES)} passed")
+    return passed == len(_INTEGRATION_CASES)
 
 
 def main():
@@ -337,11 +332,15 @@ def main():
     total_tests = len(all_tests)
     
     for test_func in all_tests:
-        try:
-            if test_func():
-                passed_tests += 1
-        except Exception as e:
-            print(f"❌ {test_func.__name__} failed with error: {e}")
+        # Buffer each suite's prints and write them out in one go
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            try:
+                if test_func():
+                    passed_tests += 1
+            except Exception as e:
+                print(f"❌ {test_func.__name__} failed with error: {e}")
+        sys.stdout.write(buffer.getvalue())
     
     print(f"\n{'='*60}")
     print(f"TEST SUMMARY: {passed_tests}/{total_tests} test suites passed")
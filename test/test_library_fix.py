@@ -4,58 +4,75 @@ Test both libraries with the correct usage
 """
 import os
 import sys
+import functools
+from concurrent.futures import ThreadPoolExecutor
 
 # Set environment
 os.environ['GOOGLE_CLOUD_PROJECT'] = 'optical-hexagon-462015-p9'
 os.environ['GOOGLE_CLOUD_LOCATION'] = 'us-central1'
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = '/home/dhayo/work/machinelearning/Multimodal_AI_MLC-NG/RebusvLMs/optical-hexagon-462015-p9-02ee74f1b2d7.json'
 
-def test_studio_api():
-    """Test Studio API with google-generativeai"""
-    print("\n🧪 Testing Studio API (google-generativeai)...")
+@functools.lru_cache(maxsize=4)
+def _studio_model(name="gemini-1.5-flash"):
+    """Configure google-generativeai once and reuse the model per name"""
+    import google.generativeai as genai
+    
+    # Configure with API key
+    genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
+    return genai.GenerativeModel(name)
+
+@functools.lru_cache(maxsize=4)
+def _vertex_client(project, location):
+    """Build one google-genai Vertex AI client per (project, location)"""
+    from google import genai
+    
+    return genai.Client(vertexai=True, project=project, location=location)
+
+def test_studio_api(log=print):
+    """Test Studio API with google-generativeai (output goes through `log`)"""
+    log("\n🧪 Testing Studio API (google-generativeai)...")
+    
+    # Without a key the SDK cannot authenticate, so don't pay for importing it
+    if not os.environ.get('GEMINI_API_KEY'):
+        log("❌ Studio API failed: GEMINI_API_KEY not set")
+        return False
     
     try:
-        import google.generativeai as genai
         import PIL.Image
         
-        # Configure with API key
-        api_key = os.environ.get('GEMINI_API_KEY')
-        genai.configure(api_key=api_key)
-        
         # Test text-only first
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        model = _studio_model("gemini-1.5-flash")
         response = model.generate_content("Hello, how are you?")
-        print("✅ Studio API text-only: SUCCESS")
-        print(f"   Response: {response.text[:100]}...")
+        log("✅ Studio API text-only: SUCCESS")
+        log(f"   Response: {response.text[:100]}...")
         
         # Test with image if available
         img_path = "data/raw/img/001.jpg"
         if os.path.exists(img_path):
-            img = PIL.Image.open(img_path)
+            # Read the pixels now so the file is closed before the API call
+            with PIL.Image.open(img_path) as img:
+                img.load()
             response = model.generate_content(["What do you see in this image?", img])
-            print("✅ Studio API with image: SUCCESS")
-            print(f"   Response: {response.text[:100]}...")
+            log("✅ Studio API with image: SUCCESS")
+            log(f"   Response: {response.text[:100]}...")
         else:
-            print("⚠️  No test image found, skipping image test")
+            log("⚠️  No test image found, skipping image test")
         
         return True
         
     except Exception as e:
-        print(f"❌ Studio API failed: {e}")
+        log(f"❌ Studio API failed: {e}")
         return False
 
-def test_vertex_api():
-    """Test Vertex AI with google-genai"""
-    print("\n🧪 Testing Vertex AI (google-genai)...")
+def test_vertex_api(log=print):
+    """Test Vertex AI with google-genai (output goes through `log`)"""
+    log("\n🧪 Testing Vertex AI (google-genai)...")
     
     try:
-        from google import genai
-        
         # Initialize Vertex AI client
-        client = genai.Client(
-            vertexai=True,
-            project=os.environ.get('GOOGLE_CLOUD_PROJECT'),
-            location=os.environ.get('GOOGLE_CLOUD_LOCATION')
+        client = _vertex_client(
+            os.environ.get('GOOGLE_CLOUD_PROJECT'),
+            os.environ.get('GOOGLE_CLOUD_LOCATION')
         )
         
         # Test text-only
@@ -63,13 +80,13 @@ def test_vertex_api():
             model="projects/optical-hexagon-462015-p9/locations/us-central1/publishers/google/models/gemini-2.0-flash-001",
             contents="Hello, how are you?"
         )
-        print("✅ Vertex AI text-only: SUCCESS")
-        print(f"   Response: {response}")
+        log("✅ Vertex AI text-only: SUCCESS")
+        log(f"   Response: {response}")
         
         return True
         
     except Exception as e:
-        print(f"❌ Vertex AI failed: {e}")
+        log(f"❌ Vertex AI failed: {e}")
         return False
 
 if __name__ == "__main__":
@@ -81,8 +98,17 @@ if __name__ == "__main__":
         print("❌ GEMINI_API_KEY not set")
         sys.exit(1)
     
-    studio_ok = test_studio_api()
-    vertex_ok = test_vertex_api()
+    # Both probes are network-bound, so run them side by side and print each
+    # one's buffered output afterwards in the usual order
+    studio_lines, vertex_lines = [], []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        studio_future = executor.submit(test_studio_api, studio_lines.append)
+        vertex_future = executor.submit(test_vertex_api, vertex_lines.append)
+        studio_ok = studio_future.result()
+        vertex_ok = vertex_future.result()
+    
+    for line in studio_lines + vertex_lines:
+        print(line)
     
     print("\n" + "=" * 50)
     print("📊 Results:")
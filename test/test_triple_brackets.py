@@ -1,9 +1,20 @@
 import sys
 import os
+import io
+import contextlib
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from experiments.evaluate import extract_idiom, normalize_idiom
 
+# Examples based on the format from your colleague's code: (response, expected)
+_COLLEAGUE_EXAMPLES = (
+    ('The idiom shown is {{{a drop in the bucket}}}.', "a drop in the bucket"),
+    ('Looking at this image, I can see... Therefore, the answer is {{{piece of cake}}}.', "piece of cake"),
+    ('This rebus puzzle represents {{{break the ice}}} which means...', "break the ice"),
+    ('{{{kick the bucket}}} - this is a common idiom', "kick the bucket"),
+    ('After analyzing step by step... {{{spill the beans}}}', "spill the beans"),
+)
+
 
 def test_triple_bracket_extraction():
     """Test the triple bracket format extraction."""
@@ -63,27 +74,12 @@ def test_format_examples():
     print("\n🎯 Testing Colleague-Style Examples")
     print("=" * 40)
     
-    # Examples based on the format from your colleague's code
-    colleague_examples = [
-        'The idiom shown is {{{a drop in the bucket}}}.',
-        'Looking at this image, I can see... Therefore, the answer is {{{piece of cake}}}.',
-        'This rebus puzzle represents {{{break the ice}}} which means...',
-        '{{{kick the bucket}}} - this is a common idiom',
-        'After analyzing step by step... {{{spill the beans}}}',
-    ]
-    
-    expected_answers = [
-        "a drop in the bucket",
-        "piece of cake", 
-        "break the ice",
-        "kick the bucket",
-        "spill the beans"
-    ]
-    
     print("Testing extraction from colleague-style responses...")
     passed = 0
     
-    for i, (response, expected) in enumerate(zip(colleague_examples, expected_answers)):
+    # Each response must match its own answer, so compare pair by pair
+    # (normalize_idiom is memoized, so answers are only normalized once)
+    for i, (response, expected) in enumerate(_COLLEAGUE_EXAMPLES):
         extracted = extract_idiom(response)
         normalized_extracted = normalize_idiom(extracted)
         normalized_expected = normalize_idiom(expected)
@@ -94,16 +90,24 @@ def test_format_examples():
         else:
             print(f"  ❌ Example {i+1}: Expected '{expected}', got '{extracted}'")
     
-    print(f"\n📊 Colleague-style examples: {passed}/{len(colleague_examples)} passed")
-    return passed == len(colleague_examples)
+    print(f"\n📊 Colleague-style examples: {passed}/{len(_COLLEAGUE_EXAMPLES)} passed")
+    return passed == len(_COLLEAGUE_EXAMPLES)
 
 
 def main():
     """Run all triple bracket tests."""
     print("🧪 Testing Triple Bracket Format Integration\n")
     
-    test1_passed = test_triple_bracket_extraction()
-    test2_passed = test_format_examples()
+    # Buffer each suite's prints and write them out in one go
+    results = []
+    for test_func in (test_triple_bracket_extraction, test_format_examples):
+        buffer = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buffer):
+                results.append(test_func())
+        finally:
+            sys.stdout.write(buffer.getvalue())
+    test1_passed, test2_passed = results
     
     print("\n" + "=" * 50)
     print("TRIPLE BRACKET TEST SUMMARY")
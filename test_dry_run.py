@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """Test dry-run functionality to show what it does."""
 
-import subprocess
-import sys
+import io
+import contextlib
 import time
 
+# Same arguments as the command-line dry run shown to the user
+DRY_RUN_ARGS = ["--config", "gemini1.5.yaml", "--prompt-style", "zero_shot", "--dry-run"]
+
 def test_dry_run():
     """Test the dry-run functionality."""
     print("🏃 Testing Dry-Run Functionality")
@@ -17,14 +20,17 @@ def test_dry_run():
     start_time = time.time()
     
     try:
-        # Run the dry-run command
-        result = subprocess.run([
-            sys.executable, 
-            "experiments/run_experiment.py",
-            "--config", "gemini1.5.yaml",
-            "--prompt-style", "zero_shot", 
-            "--dry-run"
-        ], capture_output=True, text=True, timeout=30)
+        # Run the dry-run in this interpreter, capturing what it prints. There
+        # is no timeout: a dry run makes no API calls, so it cannot hang on one
+        output = io.StringIO()
+        errors = io.StringIO()
+        error = None
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+            try:
+                from experiments import run_experiment
+                run_experiment.main(DRY_RUN_ARGS)
+            except (Exception, SystemExit) as e:
+                error = e
         
         end_time = time.time()
         duration = end_time - start_time
@@ -32,14 +38,16 @@ def test_dry_run():
         print(f"⏱️  Execution time: {duration:.2f} seconds")
         print()
         
-        if result.returncode == 0:
+        if error is None:
             print("✅ Dry-run completed successfully!")
             print("\n📋 Output:")
-            print(result.stdout)
+            print(output.getvalue())
         else:
             print("❌ Dry-run failed!")
             print("\n📋 Error:")
-            print(result.stderr)
+            print(output.getvalue())
+            print(errors.getvalue())
+            print(f"{type(error).__name__}: {error}")
             
         print("\n🔍 What dry-run validated:")
         print("- ✅ Configuration files loaded correctly")
@@ -48,9 +56,6 @@ def test_dry_run():
         print("- ✅ No API calls were made (no costs)")
         print("- ✅ Ready for real experiments")
         
-    except subprocess.TimeoutExpired:
-        print("⏰ Dry-run timed out (> 30 seconds)")
-        print("This might indicate a configuration issue")
     except Exception as e:
         print(f"❌ Error running dry-run: {e}")
 
@@ -1,5 +1,7 @@
 import os
+import re
 import sys
+import functools
 import importlib.util
 from pathlib import Path
 
@@ -7,23 +9,33 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+# Leading project name of a requirements.txt line (before any version/extras)
+_REQUIREMENT_NAME_PATTERN = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)')
+
 
 def check_file_exists(filepath: str) -> bool:
     """Check if a file exists."""
     return os.path.exists(filepath)
 
 
+@functools.lru_cache(maxsize=None)
+def load_module_from_path(module_path: str):
+    """Execute a module file once; every later check reuses the loaded module."""
+    spec = importlib.util.spec_from_file_location("module", module_path)
+    if spec is None or spec.loader is None:
+        return None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
 def check_function_exists(module_path: str, function_name: str) -> bool:
     """Check if a function exists in a module."""
     try:
-        spec = importlib.util.spec_from_file_location("module", module_path)
-        if spec is None or spec.loader is None:
-            return False
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
-        return hasattr(module, function_name)
+        module = load_module_from_path(module_path)
     except Exception:
         return False
+    return module is not None and hasattr(module, function_name)
 
 
 def check_import_works(module_name: str) -> bool:
@@ -194,6 +206,11 @@ def verify_imports():
     return passed, len(modules_to_test)
 
 
+def normalize_package_name(name: str) -> str:
+    """Normalize a package name so 'PyYAML', 'pyyaml' and 'py_yaml' compare equal."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
 def verify_requirements():
     """Verify that requirements.txt has necessary packages."""
     print("📦 Checking Requirements:")
@@ -216,11 +233,17 @@ def verify_requirements():
         print(f"  ❌ {requirements_path} not found")
         return 0, len(required_packages)
     
+    # Collect the declared package names once; matching whole names keeps
+    # "google-genai" from being satisfied by "google-generativeai"
+    declared_packages = set()
     with open(requirements_path, 'r') as f:
-        requirements_content = f.read()
+        for line in f:
+            match = _REQUIREMENT_NAME_PATTERN.match(line)
+            if match:
+                declared_packages.add(normalize_package_name(match.group(1)))
     
     for package in required_packages:
-        if package.lower() in requirements_content.lower():
+        if normalize_package_name(package) in declared_packages:
             print(f"  ✅ {package}")
             passed += 1
         else: